@@ -7,27 +7,101 @@ tramite la Meta Marketing API, con tool per analisi e gestione.
 """
 
 import os
-import json
-from typing import Optional, List, Dict, Any
+import io
+import asyncio
+import heapq
+import random
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Optional, List, Dict, Any, AsyncIterator, Tuple, Annotated
 from enum import Enum
 from datetime import datetime, timedelta
 import httpx
-from pydantic import BaseModel, Field, field_validator, ConfigDict
+import orjson
+from typing_extensions import TypedDict
+from pydantic import AfterValidator, BaseModel, Field, FailFast, TypeAdapter, field_validator, ConfigDict, with_config
+from pydantic.dataclasses import dataclass
 from mcp.server.fastmcp import FastMCP
-from dotenv import load_dotenv
 from pathlib import Path
+from urllib.parse import urlencode
 
-# Carica variabili d'ambiente dal file .env
-env_path = Path(__file__).parent / '.env'
-load_dotenv(dotenv_path=env_path)
+# Carica variabili d'ambiente dal file .env, solo se il token non è già
+# fornito dall'ambiente (es. dalla configurazione del client MCP): in quel
+# caso python-dotenv non viene nemmeno importato
+if not os.getenv("META_ACCESS_TOKEN"):
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        # python-dotenv è opzionale: senza, il token va passato via ambiente
+        pass
+    else:
+        load_dotenv(dotenv_path=Path(__file__).parent / '.env')
 
-# Inizializza il server MCP
-mcp = FastMCP("meta_ads_mcp")
+# Token letto una sola volta all'avvio (la validazione avviene alla prima chiamata)
+_ACCESS_TOKEN = os.getenv("META_ACCESS_TOKEN")
 
 # Costanti
 API_BASE_URL = "https://graph.facebook.com/v21.0"
 CHARACTER_LIMIT = 25000
 DEFAULT_TIMEOUT = 60.0
+MAX_CONCURRENT_REQUESTS = 10  # Limite di richieste parallele verso la Graph API
+GRAPH_BATCH_LIMIT = 50  # Numero massimo di sotto-richieste per chiamata batch
+API_CACHE_MAXSIZE = 512
+API_CACHE_TTL = 60.0  # Secondi di validità delle risposte GET in cache
+API_CACHE_TTL_TODAY = 15.0  # Gli insights di oggi cambiano di continuo
+API_CACHE_TTL_YESTERDAY = 30.0  # I dati di ieri possono ancora assestarsi
+API_CACHE_TTL_HISTORICAL = 3600.0  # Intervalli since/until interamente passati
+ADSET_META_TTL = 30.0  # Validità di nome/stato/budget letti prima degli aggiornamenti
+API_MAX_RETRIES = 5  # Tentativi aggiuntivi su rate limit / errori temporanei
+API_MAX_BACKOFF = 60.0  # Attesa massima (secondi) tra due tentativi
+API_USAGE_THRESHOLD = 90.0  # % di utilizzo oltre cui rallentare le richieste
+API_USAGE_PAUSE = 5.0  # Pausa (secondi) se Meta non indica un tempo di reset
+
+# Output JSON compatto per default; indentato solo se richiesto (debug).
+# Letto dall'ambiente: il .env viene caricato solo se manca META_ACCESS_TOKEN.
+# OPT_NON_STR_KEYS accetta anche dizionari con chiavi non stringa (es. int)
+_JSON_OPTIONS = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if os.getenv("META_ADS_PRETTY_JSON") else 0)
+
+# Client HTTP condiviso: riutilizza le connessioni (keep-alive + HTTP/2) verso
+# graph.facebook.com evitando un handshake TCP+TLS a ogni chiamata.
+# L'access token è un parametro di default, unito a quelli di ogni richiesta.
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_client() -> httpx.AsyncClient:
+    """Ritorna il client HTTP condiviso, creandolo al primo uso o dopo la chiusura."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            base_url=API_BASE_URL,
+            params={"access_token": _ACCESS_TOKEN} if _ACCESS_TOKEN else None,
+            http2=True,
+            timeout=DEFAULT_TIMEOUT,
+            limits=httpx.Limits(
+                max_keepalive_connections=32,
+                max_connections=64,
+                keepalive_expiry=75.0
+            )
+        )
+    return _client
+
+
+@asynccontextmanager
+async def _lifespan(server: FastMCP) -> AsyncIterator[None]:
+    """Chiude il client HTTP condiviso allo spegnimento del server."""
+    global _client
+    try:
+        yield
+    finally:
+        if _client is not None:
+            await _client.aclose()
+            _client = None
+
+
+# Inizializza il server MCP
+mcp = FastMCP("meta_ads_mcp", lifespan=_lifespan)
 
 
 class ResponseFormat(str, Enum):
@@ -99,9 +173,21 @@ class BillingEvent(str, Enum):
 
 # Modelli Pydantic per validazione input
 
-class ListAccountsInput(BaseModel):
+def _ensure_act(v: str) -> str:
+    """Assicura che l'account ID abbia il prefisso corretto."""
+    return v if v.startswith("act_") else "act_" + v
+
+
+# ID account normalizzato con prefisso 'act_' (dopo strip e controllo lunghezza)
+AccountId = Annotated[str, Field(min_length=1), AfterValidator(_ensure_act)]
+
+# Gli input più piccoli sono dataclass Pydantic con slots: stessa validazione e
+# stesso schema MCP, senza il costo di costruzione di un BaseModel
+
+
+@dataclass(slots=True, frozen=True, config=ConfigDict(str_strip_whitespace=True, extra="ignore"))
+class ListAccountsInput:
     """Input per listare gli account pubblicitari."""
-    model_config = ConfigDict(str_strip_whitespace=True, validate_assignment=True)
 
     limit: Optional[int] = Field(
         default=25,
@@ -117,12 +203,11 @@ class ListAccountsInput(BaseModel):
 
 class ListCampaignsInput(BaseModel):
     """Input per listare le campagne di un account."""
-    model_config = ConfigDict(str_strip_whitespace=True, validate_assignment=True)
+    model_config = ConfigDict(str_strip_whitespace=True, frozen=True, extra="ignore")
 
-    account_id: str = Field(
+    account_id: AccountId = Field(
         ...,
-        description="ID dell'account pubblicitario (formato: 'act_123456789' o solo '123456789')",
-        min_length=1
+        description="ID dell'account pubblicitario (formato: 'act_123456789' o solo '123456789')"
     )
     limit: Optional[int] = Field(
         default=25,
@@ -130,23 +215,19 @@ class ListCampaignsInput(BaseModel):
         ge=1,
         le=100
     )
+    include_schedule: bool = Field(
+        default=False,
+        description="Includi date di inizio/fine delle campagne (start_time, stop_time)"
+    )
     response_format: ResponseFormat = Field(
         default=ResponseFormat.MARKDOWN,
         description="Formato output"
     )
 
-    @field_validator('account_id')
-    @classmethod
-    def validate_account_id(cls, v: str) -> str:
-        """Assicura che l'account ID abbia il prefisso corretto."""
-        if not v.startswith('act_'):
-            return f'act_{v}'
-        return v
-
 
 class ListAdSetsInput(BaseModel):
     """Input per listare gli ad set di una campagna."""
-    model_config = ConfigDict(str_strip_whitespace=True, validate_assignment=True)
+    model_config = ConfigDict(str_strip_whitespace=True, frozen=True, extra="ignore")
 
     campaign_id: str = Field(
         ...,
@@ -167,7 +248,7 @@ class ListAdSetsInput(BaseModel):
 
 class ListAdsInput(BaseModel):
     """Input per listare gli annunci di un ad set."""
-    model_config = ConfigDict(str_strip_whitespace=True, validate_assignment=True)
+    model_config = ConfigDict(str_strip_whitespace=True, frozen=True, extra="ignore")
 
     adset_id: str = Field(
         ...,
@@ -188,7 +269,7 @@ class ListAdsInput(BaseModel):
 
 class GetInsightsInput(BaseModel):
     """Input per ottenere metriche di performance."""
-    model_config = ConfigDict(str_strip_whitespace=True, validate_assignment=True)
+    model_config = ConfigDict(str_strip_whitespace=True, frozen=True, extra="ignore")
 
     object_id: str = Field(
         ...,
@@ -232,9 +313,9 @@ class GetInsightsInput(BaseModel):
         return v
 
 
-class GetCreativeInput(BaseModel):
+@dataclass(slots=True, frozen=True, config=ConfigDict(str_strip_whitespace=True, extra="ignore"))
+class GetCreativeInput:
     """Input per ottenere i dettagli creativi di un annuncio."""
-    model_config = ConfigDict(str_strip_whitespace=True, validate_assignment=True)
 
     ad_id: str = Field(
         ...,
@@ -247,16 +328,40 @@ class GetCreativeInput(BaseModel):
     )
 
 
+class GetCreativesBulkInput(BaseModel):
+    """Input per ottenere i creative di più annunci in una sola chiamata."""
+    model_config = ConfigDict(str_strip_whitespace=True, frozen=True, extra="ignore")
+
+    ad_ids: Annotated[List[Annotated[str, Field(min_length=1)]], FailFast()] = Field(
+        ...,
+        description="Lista di ID annuncio (1-50), es. ['120212345678901234', '120212345678905678']",
+        min_length=1,
+        max_length=GRAPH_BATCH_LIMIT
+    )
+    response_format: ResponseFormat = Field(
+        default=ResponseFormat.MARKDOWN,
+        description="Formato output"
+    )
+
+
+class TimeRange(BaseModel):
+    """Intervallo di date per il confronto tra più periodi."""
+    model_config = ConfigDict(str_strip_whitespace=True, frozen=True, extra="ignore")
+
+    since: str = Field(..., description="Data inizio (formato: YYYY-MM-DD)", min_length=1)
+    until: str = Field(..., description="Data fine (formato: YYYY-MM-DD)", min_length=1)
+
+
 class GenerateReportInput(BaseModel):
     """Input per generare report con breakdown demografici e geografici."""
-    model_config = ConfigDict(str_strip_whitespace=True, validate_assignment=True)
+    model_config = ConfigDict(str_strip_whitespace=True, frozen=True, extra="ignore")
 
     object_id: str = Field(
         ...,
         description="ID dell'oggetto da analizzare (account, campagna, ad set o ad)",
         min_length=1
     )
-    breakdowns: List[BreakdownType] = Field(
+    breakdowns: Annotated[List[BreakdownType], FailFast()] = Field(
         default=[BreakdownType.AGE],
         description="Dimensioni di breakdown da applicare (max 4)",
         max_length=4
@@ -273,6 +378,11 @@ class GenerateReportInput(BaseModel):
         default=None,
         description="Data fine custom range (formato: YYYY-MM-DD). Richiede anche 'since'"
     )
+    time_ranges: Optional[List[TimeRange]] = Field(
+        default=None,
+        description="Più periodi da confrontare in una sola richiesta (es. questa settimana vs la precedente). Ha priorità su since/until e date_preset",
+        min_length=1
+    )
     response_format: ResponseFormat = Field(
         default=ResponseFormat.MARKDOWN,
         description="Formato output"
@@ -296,7 +406,7 @@ class AdSetStatus(str, Enum):
 
 class UpdateAdSetTargetingInput(BaseModel):
     """Input per aggiornare il targeting di un ad set."""
-    model_config = ConfigDict(str_strip_whitespace=True, validate_assignment=True)
+    model_config = ConfigDict(str_strip_whitespace=True, frozen=True, extra="ignore")
 
     adset_id: str = Field(
         ...,
@@ -315,7 +425,7 @@ class UpdateAdSetTargetingInput(BaseModel):
         ge=18,
         le=65
     )
-    genders: Optional[List[int]] = Field(
+    genders: Annotated[Optional[List[Annotated[int, Field(ge=1, le=2)]]], FailFast()] = Field(
         default=None,
         description="Lista generi: 1=uomini, 2=donne. Lasciare None per tutti"
     )
@@ -324,16 +434,6 @@ class UpdateAdSetTargetingInput(BaseModel):
         description="Formato output"
     )
 
-    @field_validator('genders')
-    @classmethod
-    def validate_genders(cls, v: Optional[List[int]]) -> Optional[List[int]]:
-        """Valida che i valori di genere siano corretti."""
-        if v is not None:
-            for gender in v:
-                if gender not in [1, 2]:
-                    raise ValueError("I valori di genere devono essere 1 (uomini) o 2 (donne)")
-        return v
-
     @field_validator('age_max')
     @classmethod
     def validate_age_range(cls, v: Optional[int], info) -> Optional[int]:
@@ -346,7 +446,7 @@ class UpdateAdSetTargetingInput(BaseModel):
 
 class UpdateAdSetBudgetInput(BaseModel):
     """Input per aggiornare il budget di un ad set."""
-    model_config = ConfigDict(str_strip_whitespace=True, validate_assignment=True)
+    model_config = ConfigDict(str_strip_whitespace=True, frozen=True, extra="ignore")
 
     adset_id: str = Field(
         ...,
@@ -364,9 +464,9 @@ class UpdateAdSetBudgetInput(BaseModel):
     )
 
 
-class UpdateAdSetStatusInput(BaseModel):
+@dataclass(slots=True, frozen=True, config=ConfigDict(str_strip_whitespace=True, extra="ignore"))
+class UpdateAdSetStatusInput:
     """Input per cambiare lo stato di un ad set."""
-    model_config = ConfigDict(str_strip_whitespace=True, validate_assignment=True)
 
     adset_id: str = Field(
         ...,
@@ -385,12 +485,11 @@ class UpdateAdSetStatusInput(BaseModel):
 
 class CreateCampaignInput(BaseModel):
     """Input per creare una nuova campagna."""
-    model_config = ConfigDict(str_strip_whitespace=True, validate_assignment=True)
+    model_config = ConfigDict(str_strip_whitespace=True, frozen=True, extra="ignore")
 
-    account_id: str = Field(
+    account_id: AccountId = Field(
         ...,
-        description="ID dell'account pubblicitario (formato: 'act_123456789' o solo '123456789')",
-        min_length=1
+        description="ID dell'account pubblicitario (formato: 'act_123456789' o solo '123456789')"
     )
     name: str = Field(
         ...,
@@ -416,7 +515,7 @@ class CreateCampaignInput(BaseModel):
         description="Budget totale lifetime in centesimi (es. 10000 = €100). Richiesto se non specifichi daily_budget",
         ge=100
     )
-    special_ad_categories: Optional[List[str]] = Field(
+    special_ad_categories: Annotated[Optional[List[str]], FailFast()] = Field(
         default=["NONE"],
         description="Categorie speciali: CREDIT, EMPLOYMENT, HOUSING, ISSUES_ELECTIONS_POLITICS, ONLINE_GAMBLING_AND_GAMING, NONE (default)"
     )
@@ -425,14 +524,6 @@ class CreateCampaignInput(BaseModel):
         description="Formato output"
     )
 
-    @field_validator('account_id')
-    @classmethod
-    def validate_account_id(cls, v: str) -> str:
-        """Assicura che l'account ID abbia il prefisso corretto."""
-        if not v.startswith('act_'):
-            return f'act_{v}'
-        return v
-
     @field_validator('daily_budget')
     @classmethod
     def validate_budgets(cls, v: Optional[int], info) -> Optional[int]:
@@ -447,13 +538,17 @@ class CreateCampaignInput(BaseModel):
 
 class CreateAdSetInput(BaseModel):
     """Input per creare un nuovo ad set."""
-    model_config = ConfigDict(str_strip_whitespace=True, validate_assignment=True)
+    model_config = ConfigDict(str_strip_whitespace=True, frozen=True, extra="ignore")
 
     campaign_id: str = Field(
         ...,
         description="ID della campagna a cui associare l'ad set",
         min_length=1
     )
+    account_id: Optional[AccountId] = Field(
+        default=None,
+        description="ID dell'account pubblicitario della campagna (es. 'act_123456789'). Se omesso viene ricavato dalla campagna"
+    )
     name: str = Field(
         ...,
         description="Nome dell'ad set",
@@ -533,117 +628,788 @@ class CreateAdSetInput(BaseModel):
 
 # Funzioni di utilità condivise
 
+class _TTLCache:
+    """Cache LRU in memoria con scadenza per singola voce e dimensione massima."""
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Any) -> Any:
+        """Restituisce il valore in cache o None se assente/scaduto."""
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Any, value: Any, ttl: float) -> None:
+        """Salva un valore con la scadenza indicata (in secondi)."""
+        if key in self._data:
+            self._data.move_to_end(key)
+        elif len(self._data) >= self.maxsize:
+            # Rimuove la voce usata meno di recente
+            self._data.popitem(last=False)
+        self._data[key] = (time.monotonic() + ttl, value)
+
+    def clear(self) -> None:
+        """Svuota la cache."""
+        self._data.clear()
+
+
+# Cache dei body delle risposte GET, chiave: (endpoint, parametri senza access token)
+_API_CACHE = _TTLCache(API_CACHE_MAXSIZE)
+
+
+# Valori dei preset confrontati a ogni GET, risolti una volta sola
+_TODAY = DatePreset.TODAY.value
+_YESTERDAY = DatePreset.YESTERDAY.value
+
+
+def _cache_ttl(params: Dict[str, Any]) -> float:
+    """Durata in cache di una risposta GET in base al periodo richiesto."""
+    date_preset = params.get("date_preset")
+    if date_preset == _TODAY:
+        return API_CACHE_TTL_TODAY
+    if date_preset == _YESTERDAY:
+        return API_CACHE_TTL_YESTERDAY
+    time_range = params.get("time_range")
+    time_ranges = params.get("time_ranges")
+    if time_range or time_ranges:
+        ranges = orjson.loads(time_ranges) if time_ranges else [orjson.loads(time_range)]
+        # Margine di un giorno: "oggi" dipende dal fuso orario dell'account
+        cutoff = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
+        if max(r.get("until", cutoff) for r in ranges) < cutoff:
+            return API_CACHE_TTL_HISTORICAL
+    return API_CACHE_TTL
+
+
+# Limita le richieste concorrenti per non incorrere nel rate limit di Meta
+_REQUEST_SEMAPHORE = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+
+
 def _get_access_token() -> str:
-    """Recupera il token di accesso dalle variabili d'ambiente."""
-    token = os.getenv("META_ACCESS_TOKEN")
-    if not token:
+    """Restituisce il token di accesso letto dalle variabili d'ambiente all'avvio."""
+    if not _ACCESS_TOKEN:
         raise ValueError(
             "META_ACCESS_TOKEN non trovato. "
             "Imposta la variabile d'ambiente con il tuo access token Meta. "
             "Vedi README.md per istruzioni su come ottenerlo."
         )
-    return token
+    return _ACCESS_TOKEN
+
+
+@lru_cache(maxsize=32)
+def _list_params(fields: str, limit: int) -> Tuple[Tuple[str, Any], ...]:
+    """Parametri delle richieste di lista, memorizzati per coppia (fields, limit)."""
+    return (("fields", fields), ("limit", limit))
+
+
+@lru_cache(maxsize=256)
+def _time_range_json(since: str, until: str) -> str:
+    """Parametro time_range serializzato per una coppia di date."""
+    return orjson.dumps({"since": since, "until": until}).decode()
+
+
+@lru_cache(maxsize=64)
+def _breakdown_csv(breakdowns: Tuple[BreakdownType, ...]) -> str:
+    """Parametro breakdowns come lista separata da virgole."""
+    return ",".join(b.value for b in breakdowns)
+
+
+# Codici di errore Graph API che indicano throttling (richiesta non eseguita)
+_THROTTLE_ERROR_CODES = frozenset({4, 17, 32, 613, 80000, 80001, 80002, 80003, 80004, 80005, 80006, 80008, 80009, 80014})
+
+# Header con l'utilizzo corrente delle quote (app, business e ad account)
+_USAGE_HEADERS = ("x-app-usage", "x-business-use-case-usage", "x-ad-account-usage")
+_USAGE_FIELDS = ("call_count", "total_cputime", "total_time", "acc_id_util_pct")
+
+# Istante (time.monotonic) fino a cui sospendere le richieste, per ad account
+_THROTTLED_UNTIL: Dict[str, float] = {}
+
+
+def _usage_key(endpoint: str) -> str:
+    """Chiave di throttling: l'ad account dell'endpoint, o '' se non è esplicito."""
+    head = endpoint.split("/", 1)[0]
+    return head if head.startswith("act_") else ""
+
+
+def _usage_pause(usage: Any) -> float:
+    """Secondi di pausa suggeriti da un header di utilizzo (0 se sotto soglia)."""
+    if not isinstance(usage, dict):
+        return 0.0
+    # X-Business-Use-Case-Usage: {business_id: [{...}, ...]}; gli altri sono piatti
+    entries = [e for v in usage.values() if isinstance(v, list) for e in v if isinstance(e, dict)] or [usage]
+
+    pause = 0.0
+    for entry in entries:
+        regain_minutes = float(entry.get("estimated_time_to_regain_access") or 0)
+        if regain_minutes:
+            pause = max(pause, regain_minutes * 60)
+        elif max(float(entry.get(f) or 0) for f in _USAGE_FIELDS) >= API_USAGE_THRESHOLD:
+            pause = max(pause, float(entry.get("reset_time_duration") or 0) or API_USAGE_PAUSE)
+    return pause
+
+
+def _record_usage(key: str, headers: httpx.Headers) -> None:
+    """Aggiorna la pausa per l'ad account in base agli header di utilizzo."""
+    pause = 0.0
+    for name in _USAGE_HEADERS:
+        raw = headers.get(name)
+        if raw:
+            try:
+                pause = max(pause, _usage_pause(orjson.loads(raw)))
+            except (ValueError, TypeError):
+                continue
+    if pause:
+        _THROTTLED_UNTIL[key] = time.monotonic() + min(pause, API_MAX_BACKOFF)
+
+
+def _should_retry(method: str, response: httpx.Response) -> bool:
+    """True se la risposta indica un errore temporaneo da ritentare."""
+    status_code = response.status_code
+    if status_code == 429:
+        return True
+    if status_code >= 500:
+        # Una scrittura fallita lato server potrebbe essere stata applicata
+        return method == "GET"
+    if status_code in (400, 403):
+        try:
+            code = orjson.loads(response.content).get("error", {}).get("code")
+        except (ValueError, AttributeError):
+            return False
+        return code in _THROTTLE_ERROR_CODES
+    return False
+
+
+def _retry_delay(attempt: int, response: httpx.Response) -> float:
+    """Backoff esponenziale con jitter, o il Retry-After indicato da Meta."""
+    retry_after = response.headers.get("retry-after", "")
+    if retry_after.isdigit():
+        return min(API_MAX_BACKOFF, float(retry_after))
+    return min(API_MAX_BACKOFF, 2 ** attempt + random.random())
+
+
+async def _send_request(method: str, endpoint: str, params: Dict[str, Any], **kwargs) -> httpx.Response:
+    """Invia la richiesta rispettando le quote di Meta e ritentando su throttling."""
+    key = _usage_key(endpoint)
+    for attempt in range(API_MAX_RETRIES + 1):
+        delay = _THROTTLED_UNTIL.get(key, 0.0) - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        # Meta Graph API accetta parametri come query string per tutte le operazioni
+        async with _REQUEST_SEMAPHORE:
+            response = await _get_client().request(
+                method,
+                endpoint,
+                params=params,
+                **kwargs
+            )
+        _record_usage(key, response.headers)
+
+        if attempt == API_MAX_RETRIES or not _should_retry(method, response):
+            break
+        await asyncio.sleep(_retry_delay(attempt, response))
+
+    return response
 
 
 async def _make_api_request(
     endpoint: str,
     method: str = "GET",
     params: Optional[Dict[str, Any]] = None,
+    use_cache: bool = True,
     **kwargs
 ) -> Dict[str, Any]:
-    """Funzione riutilizzabile per tutte le chiamate API."""
-    access_token = _get_access_token()
+    """
+    Funzione riutilizzabile per tutte le chiamate API.
+
+    Le richieste GET vengono servite da una cache in memoria a breve scadenza
+    (use_cache=False forza una lettura fresca); qualsiasi scrittura svuota la
+    cache per non restituire dati obsoleti. Rate limit e errori temporanei
+    vengono ritentati con backoff esponenziale (vedi _send_request).
+    """
+    _get_access_token()
 
     if params is None:
         params = {}
-    params["access_token"] = access_token
 
-    async with httpx.AsyncClient() as client:
-        url = f"{API_BASE_URL}/{endpoint}"
+    if method == "GET":
+        cache_key = (endpoint, tuple(sorted(params.items())))
+        if use_cache:
+            cached = _API_CACHE.get(cache_key)
+            if cached is not None:
+                return orjson.loads(cached)
 
-        # Meta Graph API accetta parametri come query string per tutte le operazioni
-        response = await client.request(
-            method,
-            url,
-            params=params,
-            timeout=DEFAULT_TIMEOUT,
-            **kwargs
+    response = await _send_request(method, endpoint, params, **kwargs)
+    response.raise_for_status()
+    data = orjson.loads(response.content)
+
+    if method == "GET":
+        # In cache vanno i byte originali: ogni hit li decodifica in un dict
+        # nuovo, più economico di una deepcopy e al riparo da mutazioni
+        _API_CACHE.set(cache_key, response.content, _cache_ttl(params))
+    else:
+        _API_CACHE.clear()
+
+    return data
+
+
+async def _make_api_requests(specs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Esegue in parallelo più chiamate API indipendenti.
+
+    Ogni elemento di specs contiene gli argomenti di _make_api_request
+    (endpoint, method, params, ...). I risultati sono restituiti nello stesso
+    ordine delle specifiche; la concorrenza è limitata da MAX_CONCURRENT_REQUESTS.
+    """
+    return await asyncio.gather(*(_make_api_request(**spec) for spec in specs))
+
+
+def _batch_error(sub_request: Dict[str, Any], item: Optional[Dict[str, Any]]) -> Exception:
+    """Converte una sotto-richiesta batch fallita nell'eccezione httpx equivalente."""
+    request = httpx.Request(sub_request["method"], f"{API_BASE_URL}/{sub_request['relative_url']}")
+    if item is None:
+        # Meta restituisce null per le sotto-richieste non completate in tempo
+        return httpx.ReadTimeout("Sotto-richiesta batch non completata", request=request)
+    response = httpx.Response(
+        item.get("code", 500),
+        content=(item.get("body") or "").encode(),
+        request=request
+    )
+    return httpx.HTTPStatusError(
+        f"Sotto-richiesta batch fallita (status {response.status_code})",
+        request=request,
+        response=response
+    )
+
+
+async def _graph_batch(requests: List[Dict[str, Any]]) -> List[Any]:
+    """
+    Esegue più sotto-richieste tramite l'endpoint batch della Graph API.
+
+    Ogni elemento ha il formato {"method": "GET", "relative_url": "123?fields=name"}.
+    Le sotto-richieste sono inviate a gruppi di GRAPH_BATCH_LIMIT (un solo round
+    trip HTTP per gruppo) e i body decodificati sono restituiti nello stesso
+    ordine. Se una sotto-richiesta fallisce viene sollevata l'eccezione httpx
+    corrispondente, gestita da _handle_api_error come una chiamata normale.
+    """
+    chunks = [
+        requests[i:i + GRAPH_BATCH_LIMIT]
+        for i in range(0, len(requests), GRAPH_BATCH_LIMIT)
+    ]
+    responses = await _make_api_requests([
+        {"endpoint": "", "method": "POST", "data": {"batch": orjson.dumps(chunk).decode(), "include_headers": "false"}}
+        for chunk in chunks
+    ])
+
+    results = []
+    for chunk, response in zip(chunks, responses):
+        for sub_request, item in zip(chunk, response):
+            if item is None or item.get("code") != 200:
+                raise _batch_error(sub_request, item)
+            results.append(orjson.loads(item["body"]))
+    return results
+
+
+# Nome, stato e budget degli ad set letti dai tool di aggiornamento. Servono
+# solo a mostrare il valore precedente, quindi una lettura recente basta;
+# dopo ogni scrittura la voce viene aggiornata senza una nuova GET (_update_adset)
+_ADSET_META_CACHE = _TTLCache(256)
+_ADSET_META_FIELDS = "name,status,daily_budget"
+
+
+async def _get_adset_meta(adset_id: str, refresh: bool = False) -> Dict[str, Any]:
+    """Nome, stato e budget giornaliero di un ad set (cache di ADSET_META_TTL secondi)."""
+    if not refresh:
+        meta = _ADSET_META_CACHE.get(adset_id)
+        if meta is not None:
+            return meta
+    meta = await _make_api_request(adset_id, params={"fields": _ADSET_META_FIELDS}, use_cache=False)
+    _ADSET_META_CACHE.set(adset_id, meta, ADSET_META_TTL)
+    return meta
+
+
+async def _update_adset(adset_id: str, changes: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Applica changes a un ad set e restituisce (metadati precedenti, risposta della scrittura).
+
+    Se i metadati non sono in cache, lettura e scrittura viaggiano in un'unica
+    richiesta batch: la POST dipende dalla GET (depends_on), così la lettura
+    vede ancora i valori precedenti. Dopo una scrittura riuscita la cache dei
+    metadati viene aggiornata con i nuovi valori.
+    """
+    meta = _ADSET_META_CACHE.get(adset_id)
+    if meta is None:
+        meta, update_data = await _graph_batch([
+            {
+                "method": "GET",
+                "name": "current",
+                "omit_response_on_success": False,
+                "relative_url": f"{adset_id}?fields={_ADSET_META_FIELDS}"
+            },
+            {
+                "method": "POST",
+                "depends_on": "current",
+                "relative_url": adset_id,
+                "body": urlencode(changes)
+            }
+        ])
+    else:
+        update_data = await _make_api_request(adset_id, method="POST", params=changes)
+
+    if update_data.get('success'):
+        # La Graph API restituisce i valori come stringhe
+        _ADSET_META_CACHE.set(adset_id, {**meta, **{k: str(v) for k, v in changes.items()}}, ADSET_META_TTL)
+    return meta, update_data
+
+
+# Account di appartenenza delle campagne (non cambia mai: nessuna scadenza)
+_CAMPAIGN_ACCOUNTS: "OrderedDict[str, str]" = OrderedDict()
+_CAMPAIGN_ACCOUNTS_MAXSIZE = 256
+
+
+async def _resolve_account_id(campaign_id: str) -> str:
+    """Ricava l'ad account (con prefisso 'act_') di una campagna, con cache LRU."""
+    account_id = _CAMPAIGN_ACCOUNTS.get(campaign_id)
+    if account_id is not None:
+        _CAMPAIGN_ACCOUNTS.move_to_end(campaign_id)
+        return account_id
+
+    campaign_fields = await _make_api_request(
+        campaign_id,
+        params={"fields": "account_id"}
+    )
+    account_id = _ensure_act(campaign_fields.get('account_id', ''))
+
+    if account_id != 'act_':
+        _CAMPAIGN_ACCOUNTS[campaign_id] = account_id
+        if len(_CAMPAIGN_ACCOUNTS) > _CAMPAIGN_ACCOUNTS_MAXSIZE:
+            _CAMPAIGN_ACCOUNTS.popitem(last=False)
+    return account_id
+
+
+# Messaggi per gli status HTTP che non richiedono di leggere il body dell'errore
+_HTTP_ERROR_MESSAGES: Dict[int, str] = {
+    401: "Errore: Token di accesso non valido o scaduto. Genera un nuovo token e aggiorna META_ACCESS_TOKEN.",
+    403: "Errore: Permessi insufficienti. Verifica che il token abbia i permessi necessari (ads_management, ads_read).",
+    404: "Errore: Risorsa non trovata. Verifica che l'ID sia corretto.",
+    429: "Errore: Rate limit raggiunto. Attendi qualche minuto prima di riprovare."
+}
+
+_TIMEOUT_ERROR = "Errore: Timeout della richiesta. Riprova o riduci la quantità di dati richiesti."
+_SERVER_ERROR = "Errore: Problema temporaneo con i server Meta (status %d). Riprova tra qualche minuto."
+
+# Messaggi dei tool di aggiornamento quando la Graph API non conferma la scrittura
+_ADSET_UPDATE_ERRORS: Dict[str, str] = {
+    "targeting": "Errore nell'aggiornamento dell'ad set %s",
+    "budget": "Errore nell'aggiornamento del budget per ad set %s",
+    "status": "Errore nel cambio stato per ad set %s"
+}
+
+
+def _format_bad_request(response: httpx.Response) -> str:
+    """Estrae i dettagli di un errore 400 restituito dalla Graph API."""
+    try:
+        error_obj = orjson.loads(response.content).get("error", {})
+        error_msg = error_obj.get("message", "Richiesta non valida")
+        details = (
+            ("Code", error_obj.get("code", "")),
+            ("Subcode", error_obj.get("error_subcode", "")),
+            ("Titolo", error_obj.get("error_user_title", "")),
+            ("Dettagli", error_obj.get("error_user_msg", "")),
+            ("Trace ID", error_obj.get("fbtrace_id", ""))
         )
-        response.raise_for_status()
-        return response.json()
+    except (ValueError, AttributeError):
+        return "Errore: Richiesta non valida. Controlla i parametri forniti."
+
+    # Log completo per debug: solo i campi valorizzati
+    return "\n".join([f"Errore: {error_msg}", *(f"{label}: {value}" for label, value in details if value)])
 
 
 def _handle_api_error(e: Exception) -> str:
     """Gestione errori API consistente."""
     if isinstance(e, httpx.HTTPStatusError):
-        if e.response.status_code == 400:
-            try:
-                error_data = e.response.json()
-                error_obj = error_data.get("error", {})
-
-                # Estrai tutti i campi utili
-                error_msg = error_obj.get("message", "Richiesta non valida")
-                error_code = error_obj.get("code", "")
-                error_subcode = error_obj.get("error_subcode", "")
-                error_user_msg = error_obj.get("error_user_msg", "")
-                error_user_title = error_obj.get("error_user_title", "")
-                fbtrace_id = error_obj.get("fbtrace_id", "")
-
-                # Log completo per debug
-                full_error = f"Errore: {error_msg}"
-                if error_code:
-                    full_error += f"\nCode: {error_code}"
-                if error_subcode:
-                    full_error += f"\nSubcode: {error_subcode}"
-                if error_user_title:
-                    full_error += f"\nTitolo: {error_user_title}"
-                if error_user_msg:
-                    full_error += f"\nDettagli: {error_user_msg}"
-                if fbtrace_id:
-                    full_error += f"\nTrace ID: {fbtrace_id}"
-                return full_error
-            except:
-                return "Errore: Richiesta non valida. Controlla i parametri forniti."
-        elif e.response.status_code == 401:
-            return "Errore: Token di accesso non valido o scaduto. Genera un nuovo token e aggiorna META_ACCESS_TOKEN."
-        elif e.response.status_code == 403:
-            return "Errore: Permessi insufficienti. Verifica che il token abbia i permessi necessari (ads_management, ads_read)."
-        elif e.response.status_code == 404:
-            return "Errore: Risorsa non trovata. Verifica che l'ID sia corretto."
-        elif e.response.status_code == 429:
-            return "Errore: Rate limit raggiunto. Attendi qualche minuto prima di riprovare."
-        elif e.response.status_code >= 500:
-            return f"Errore: Problema temporaneo con i server Meta (status {e.response.status_code}). Riprova tra qualche minuto."
-        return f"Errore API: status code {e.response.status_code}"
+        status_code = e.response.status_code
+        message = _HTTP_ERROR_MESSAGES.get(status_code)
+        if message:
+            return message
+        if status_code == 400:
+            return _format_bad_request(e.response)
+        if status_code >= 500:
+            return _SERVER_ERROR % status_code
+        return f"Errore API: status code {status_code}"
     elif isinstance(e, httpx.TimeoutException):
-        return "Errore: Timeout della richiesta. Riprova o riduci la quantità di dati richiesti."
+        return _TIMEOUT_ERROR
     elif isinstance(e, ValueError):
         return str(e)
     return f"Errore imprevisto: {type(e).__name__} - {str(e)}"
 
 
-def _format_currency(amount: str, currency: str = "EUR") -> str:
+def _to_json(data: Any) -> str:
+    """Serializza la risposta di un tool in JSON (compatto salvo META_ADS_PRETTY_JSON)."""
+    return orjson.dumps(data, option=_JSON_OPTIONS).decode()
+
+
+def _coerce_budget(value: Any) -> int:
+    """Converte un budget della Graph API (stringa di centesimi, assente o None) in int."""
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and value.isdecimal():
+        return int(value)
+    return 0
+
+
+def _eur(cents: int) -> str:
+    """Formatta centesimi interi come euro (es. 1505 -> '15.05') senza passare dai float."""
+    sign = "-" if cents < 0 else ""
+    cents = abs(cents)
+    return f"{sign}{cents // 100}.{cents % 100:02d}"
+
+
+# Memoizzate: nei report gli stessi importi e percentuali si ripetono spesso
+@lru_cache(maxsize=2048)
+def _format_currency(amount: Any, currency: str = "EUR") -> str:
     """Formatta un valore monetario da centesimi."""
+    if isinstance(amount, (int, float)):
+        return f"{amount / 100:.2f} {currency}"
+    text = amount if isinstance(amount, str) else str(amount)
+    # Caso comune: centesimi interi, senza passare dal try/except
+    digits = text[1:] if text[:1] == '-' else text
+    if digits.isdecimal():
+        return f"{int(text) / 100:.2f} {currency}"
     try:
-        value = float(amount) / 100
-        return f"{value:.2f} {currency}"
-    except:
+        value = float(text) / 100
+    except ValueError:
         return f"{amount} (raw)"
+    return f"{value:.2f} {currency}"
 
 
+@lru_cache(maxsize=2048)
 def _format_percentage(value: float) -> str:
     """Formatta una percentuale."""
     return f"{value:.2f}%"
 
 
-def _check_truncation(content: str, data_count: int) -> str:
-    """Verifica e gestisce il troncamento della risposta."""
-    if len(content) > CHARACTER_LIMIT:
-        truncated = content[:CHARACTER_LIMIT]
-        truncated += f"\n\n⚠️ **Risposta troncata** - Mostrati primi {CHARACTER_LIMIT} caratteri su dati totali. "
-        truncated += f"Usa parametri di filtro o paginazione per vedere più risultati."
-        return truncated
-    return content
+@with_config(ConfigDict(extra="allow"))
+class _InsightRow(TypedDict, total=False):
+    """Metriche che la Graph API restituisce come stringhe negli insights."""
+
+    impressions: int
+    clicks: int
+    reach: int
+    spend: float
+    cpm: float
+    cpc: float
+    ctr: float
+
+
+# Converte in numeri le metriche di tutte le righe in un solo passaggio
+# (gli altri campi, es. breakdown e actions, restano invariati)
+_INSIGHT_ROWS = TypeAdapter(List[_InsightRow])
+
+
+class _BoundedWriter:
+    """
+    Accumula l'output Markdown fermandosi a CHARACTER_LIMIT caratteri.
+
+    write() restituisce False quando il limite è stato raggiunto, così i tool
+    interrompono il ciclo invece di formattare righe che verrebbero scartate.
+    """
+
+    def __init__(self, limit: int = CHARACTER_LIMIT) -> None:
+        self.limit = limit
+        self.size = 0
+        self.truncated = False
+        self._buf = io.StringIO()
+
+    def write(self, text: str) -> bool:
+        """Aggiunge testo al buffer; False se la risposta è stata troncata."""
+        remaining = self.limit - self.size
+        if len(text) > remaining:
+            self._buf.write(text[:remaining])
+            self.size = self.limit
+            self.truncated = True
+            return False
+        self._buf.write(text)
+        self.size += len(text)
+        return True
+
+    def getvalue(self) -> str:
+        """Restituisce il contenuto, con l'avviso di troncamento se necessario."""
+        content = self._buf.getvalue()
+        if self.truncated:
+            content += f"\n\n⚠️ **Risposta troncata** - Mostrati primi {self.limit} caratteri su dati totali. "
+            content += "Usa parametri di filtro o paginazione per vedere più risultati."
+        return content
+
+
+# Template di output Markdown
+
+# Stati account indicizzati per codice (account_status): 1=ACTIVE, 2=DISABLED, 3=UNSETTLED
+_ACCOUNT_STATUS = ("UNKNOWN", "ACTIVE", "DISABLED", "UNSETTLED")
+
+_ACCOUNT_TMPL = (
+    "## {name} ({id})\n"
+    "- **Valuta**: {currency}\n"
+    "- **Stato**: {status}\n"
+    "- **Timezone**: {timezone_name}\n"
+    "{business}\n"
+)
+
+
+def _account_view(acc: Dict[str, Any]) -> Dict[str, Any]:
+    """Prepara i campi di un account per _ACCOUNT_TMPL."""
+    status_code = acc.get("account_status", 0)
+    return {
+        **acc,
+        "status": _ACCOUNT_STATUS[status_code] if 0 <= status_code < len(_ACCOUNT_STATUS) else "UNKNOWN",
+        "timezone_name": acc.get('timezone_name', 'N/A'),
+        "business": f"- **Business**: {acc['business'].get('name', 'N/A')}\n" if 'business' in acc else ""
+    }
+
+
+_CAMPAIGN_TMPL = (
+    "## {name} ({id})\n"
+    "- **Obiettivo**: {objective}\n"
+    "- **Stato**: {status}\n"
+    "{budget}"
+    "{schedule}\n"
+)
+
+
+def _budget_line(obj: Dict[str, Any]) -> str:
+    """Riga Markdown del budget (giornaliero o lifetime) di campagne e ad set."""
+    if 'daily_budget' in obj:
+        return f"- **Budget giornaliero**: {_format_currency(obj['daily_budget'])}\n"
+    if 'lifetime_budget' in obj:
+        return f"- **Budget lifetime**: {_format_currency(obj['lifetime_budget'])}\n"
+    return ""
+
+
+def _campaign_view(camp: Dict[str, Any]) -> Dict[str, Any]:
+    """Prepara i campi di una campagna per _CAMPAIGN_TMPL."""
+    schedule = ""
+    if 'start_time' in camp:
+        schedule += f"- **Inizio**: {camp['start_time']}\n"
+    if 'stop_time' in camp:
+        schedule += f"- **Fine**: {camp['stop_time']}\n"
+    return {
+        **camp,
+        "objective": camp.get('objective', 'N/A'),
+        "status": camp.get('status', 'N/A'),
+        "budget": _budget_line(camp),
+        "schedule": schedule
+    }
+
+
+_ADSET_TMPL = (
+    "## {name} ({id})\n"
+    "- **Stato**: {status}\n"
+    "{budget}"
+    "{details}\n"
+)
+
+# Campi opzionali dell'ad set mostrati, nell'ordine, con la relativa etichetta
+_ADSET_DETAILS = (
+    ("optimization_goal", "Ottimizzazione"),
+    ("billing_event", "Billing"),
+    ("start_time", "Inizio"),
+    ("end_time", "Fine")
+)
+
+
+def _adset_view(adset: Dict[str, Any]) -> Dict[str, Any]:
+    """Prepara i campi di un ad set per _ADSET_TMPL."""
+    return {
+        **adset,
+        "status": adset.get('status', 'N/A'),
+        "budget": _budget_line(adset),
+        "details": "".join(f"- **{label}**: {adset[key]}\n" for key, label in _ADSET_DETAILS if key in adset)
+    }
+
+
+_AD_TMPL = (
+    "## {name} ({id})\n"
+    "- **Stato**: {status}\n"
+    "{creative}"
+    "- *Usa meta_ads_get_creative con ID {id} per dettagli completi*\n\n"
+)
+
+
+def _ad_view(ad: Dict[str, Any]) -> Dict[str, Any]:
+    """Prepara i campi di un annuncio per _AD_TMPL."""
+    creative = ad.get('creative')
+    return {
+        **ad,
+        "status": ad.get('status', 'N/A'),
+        "creative": (
+            f"- **Creative ID**: {creative.get('id', 'N/A')}\n"
+            f"- **Creative Nome**: {creative.get('name', 'N/A')}\n"
+        ) if creative is not None else ""
+    }
+
+
+# Le metriche numeriche arrivano già convertite da _INSIGHT_ROWS
+# (frequency resta la stringa della Graph API, mostrata così com'è)
+_INSIGHT_TMPL = (
+    "## {title}\n"
+    "- **Impressions**: {impressions:,}\n"
+    "- **Clicks**: {clicks:,}\n"
+    "- **Spend**: {spend}\n"
+    "- **CPM**: {cpm}\n"
+    "- **CPC**: {cpc}\n"
+    "- **CTR**: {ctr}\n"
+    "- **Reach**: {reach:,}\n"
+    "- **Frequency**: {frequency}\n"
+    "{actions}\n"
+)
+
+
+def _insight_view(insight: Dict[str, Any], title: str) -> Dict[str, Any]:
+    """Prepara le metriche di un insight per _INSIGHT_TMPL."""
+    actions = ""
+    if 'actions' in insight:
+        # Primi 5 tipi di conversione
+        actions = "- **Conversioni**:\n" + "".join(
+            f"  - {a.get('action_type', 'unknown')}: {a.get('value', '0')}\n" for a in insight['actions'][:5]
+        )
+    return {
+        "title": title,
+        "impressions": insight.get('impressions', 0),
+        "clicks": insight.get('clicks', 0),
+        "spend": _format_currency(insight.get('spend', 0)),
+        "cpm": _format_currency(insight.get('cpm', 0)),
+        "cpc": _format_currency(insight.get('cpc', 0)),
+        "ctr": _format_percentage(insight.get('ctr', 0)),
+        "reach": insight.get('reach', 0),
+        "frequency": insight.get('frequency', '0'),
+        "actions": actions
+    }
+
+
+# Dimensioni di breakdown mostrate nel titolo del segmento, nell'ordine
+_SEGMENT_LABELS = (
+    ("age", "Età"),
+    ("gender", "Genere"),
+    ("country", "Paese"),
+    ("region", "Regione"),
+    ("publisher_platform", "Platform"),
+    ("device_platform", "Device")
+)
+
+# Generi come restituiti dai breakdown degli insights
+_GENDER_LABELS = {'male': 'Uomo', 'female': 'Donna', 'unknown': 'Non specificato'}
+
+# Generi del targeting (1=uomini, 2=donne)
+_TARGETING_GENDERS = {1: 'Uomini', 2: 'Donne'}
+
+
+def _genders_text(genders: List[Any]) -> str:
+    """Descrive i codici genere del targeting (es. [1, 2] -> 'Uomini, Donne')."""
+    # Lookup per valore: accetta anche codici float (1.0) da targeting liberi
+    return ', '.join(_TARGETING_GENDERS.get(g, str(g)) for g in genders)
+
+
+_SEGMENT_TMPL = (
+    "## {idx}. {title}\n"
+    "- **Impressions**: {impressions:,}\n"
+    "- **Clicks**: {clicks:,}\n"
+    "- **Spend**: {spend}\n"
+    "- **CTR**: {ctr}\n"
+    "- **CPC**: {cpc}\n"
+    "{reach}"
+    "{actions}\n"
+)
+
+
+def _segment_view(insight: Dict[str, Any], idx: int, with_period: bool = False) -> Dict[str, Any]:
+    """Prepara titolo e metriche di un segmento del report per _SEGMENT_TMPL."""
+    title = " | ".join(
+        f"{label}: {_GENDER_LABELS.get(insight[key], insight[key]) if key == 'gender' else insight[key]}"
+        for key, label in _SEGMENT_LABELS if key in insight
+    )
+    if with_period:
+        # Con più periodi lo stesso segmento compare una volta per intervallo
+        period = f"Periodo: {insight.get('date_start', 'N/A')} - {insight.get('date_stop', 'N/A')}"
+        title = f"{title} | {period}" if title else period
+    return {
+        "idx": idx,
+        "title": title or f"Segmento {idx}",
+        "impressions": insight.get('impressions', 0),
+        "clicks": insight.get('clicks', 0),
+        "spend": _format_currency(insight.get('spend', 0)),
+        "ctr": _format_percentage(insight.get('ctr', 0)),
+        "cpc": _format_currency(insight.get('cpc', 0)),
+        "reach": f"- **Reach**: {insight['reach']:,}\n" if 'reach' in insight else "",
+        "actions": (
+            f"- **Conversioni totali**: {sum(int(a.get('value', 0)) for a in insight['actions'])}\n"
+            if 'actions' in insight else ""
+        )
+    }
+
+
+# Campi del creative richiesti espandendo l'annuncio
+_CREATIVE_FIELDS = "creative{id,name,title,body,image_url,link_url,call_to_action_type,object_story_spec,asset_feed_spec}"
+
+
+def _write_creative(buf: io.StringIO, ad_id: str, creative: Dict[str, Any]) -> None:
+    """Scrive nel buffer i dettagli Markdown di un creative."""
+    w = buf.write
+    w(f"Annuncio ID: {ad_id}\n")
+    w(f"Creative ID: {creative.get('id', 'N/A')}\n\n")
+
+    if 'name' in creative:
+        w(f"## {creative['name']}\n\n")
+
+    if 'title' in creative:
+        w("### Titolo\n")
+        w(f"{creative['title']}\n\n")
+
+    if 'body' in creative:
+        w("### Body Text\n")
+        w(f"{creative['body']}\n\n")
+
+    if 'link_url' in creative:
+        w(f"**Link**: {creative['link_url']}\n")
+
+    if 'call_to_action_type' in creative:
+        w(f"**Call to Action**: {creative['call_to_action_type']}\n")
+
+    if 'image_url' in creative:
+        w(f"**Immagine**: {creative['image_url']}\n")
+
+    # Object story spec
+    if 'object_story_spec' in creative:
+        w("\n### Configurazione Placement\n")
+        spec = creative['object_story_spec']
+        if 'page_id' in spec:
+            w(f"- **Page ID**: {spec['page_id']}\n")
+        if 'instagram_actor_id' in spec:
+            w(f"- **Instagram Actor ID**: {spec['instagram_actor_id']}\n")
+        if 'link_data' in spec:
+            link_data = spec['link_data']
+            if 'link' in link_data:
+                w(f"- **Link**: {link_data['link']}\n")
+            if 'message' in link_data:
+                w(f"- **Messaggio**: {link_data['message']}\n")
+
+    # Asset feed (per annunci dinamici)
+    if 'asset_feed_spec' in creative:
+        w("\n### Asset Feed (Annuncio Dinamico)\n")
+        w("*Configurazione per annunci dinamici presente*\n")
+
+
+# Intestazioni fisse dei riepiloghi dei tool di creazione
+_MD_CAMPAIGN_HEADER = "# ✅ Campagna Creata con Successo\n"
+_MD_ADSET_HEADER = "# ✅ Ad Set Creato con Successo\n"
+_MD_CONFIG = "## Configurazione\n"
+_MD_NEXT_STEPS = "\n## Prossimi Passi\n"
 
 
 # Implementazione tool
@@ -715,10 +1481,7 @@ async def meta_ads_list_accounts(params: ListAccountsInput) -> str:
     try:
         data = await _make_api_request(
             "me/adaccounts",
-            params={
-                "fields": "id,name,currency,account_status,timezone_name,business",
-                "limit": params.limit
-            }
+            params=dict(_list_params("id,name,currency,account_status,timezone_name,business{name}", params.limit))
         )
 
         accounts = data.get("data", [])
@@ -727,23 +1490,12 @@ async def meta_ads_list_accounts(params: ListAccountsInput) -> str:
             return "Nessun account pubblicitario trovato. Verifica i permessi del token."
 
         if params.response_format == ResponseFormat.MARKDOWN:
-            lines = ["# Account Pubblicitari Meta\n"]
-            lines.append(f"Trovati {len(accounts)} account\n")
-
+            w = _BoundedWriter()
+            w.write(f"# Account Pubblicitari Meta\n\nTrovati {len(accounts)} account\n\n")
             for acc in accounts:
-                status_map = {1: "ACTIVE", 2: "DISABLED", 3: "UNSETTLED"}
-                status = status_map.get(acc.get("account_status", 0), "UNKNOWN")
-
-                lines.append(f"## {acc['name']} ({acc['id']})")
-                lines.append(f"- **Valuta**: {acc['currency']}")
-                lines.append(f"- **Stato**: {status}")
-                lines.append(f"- **Timezone**: {acc.get('timezone_name', 'N/A')}")
-                if 'business' in acc:
-                    lines.append(f"- **Business**: {acc['business'].get('name', 'N/A')}")
-                lines.append("")
-
-            content = "\n".join(lines)
-            return _check_truncation(content, len(accounts))
+                if not w.write(_ACCOUNT_TMPL.format_map(_account_view(acc))):
+                    break
+            return w.getvalue()
 
         else:
             result = {
@@ -751,7 +1503,7 @@ async def meta_ads_list_accounts(params: ListAccountsInput) -> str:
                 "count": len(accounts),
                 "accounts": accounts
             }
-            return json.dumps(result, indent=2)
+            return _to_json(result)
 
     except Exception as e:
         return _handle_api_error(e)
@@ -778,6 +1530,7 @@ async def meta_ads_list_campaigns(params: ListCampaignsInput) -> str:
         params (ListCampaignsInput): Parametri validati contenenti:
             - account_id (str): ID account (formato 'act_123456789' o '123456789')
             - limit (int): Numero massimo di campagne (default: 25, range: 1-100)
+            - include_schedule (bool): Includi date inizio/fine (default: False)
             - response_format (ResponseFormat): Formato output
 
     Returns:
@@ -786,7 +1539,7 @@ async def meta_ads_list_campaigns(params: ListCampaignsInput) -> str:
             - Obiettivo pubblicitario (es. CONVERSIONS, TRAFFIC, BRAND_AWARENESS)
             - Stato (ACTIVE, PAUSED, DELETED, ARCHIVED)
             - Budget giornaliero o lifetime
-            - Date inizio/fine (se programmate)
+            - Date inizio/fine (se programmate e con include_schedule=True)
             - Numero di ad set associati
 
     Esempi d'uso:
@@ -800,12 +1553,13 @@ async def meta_ads_list_campaigns(params: ListCampaignsInput) -> str:
         - L'obiettivo indica lo scopo della campagna (conversioni, traffico, ecc.)
     """
     try:
+        fields = "id,name,objective,status,daily_budget,lifetime_budget"
+        if params.include_schedule:
+            fields += ",start_time,stop_time"
+
         data = await _make_api_request(
             f"{params.account_id}/campaigns",
-            params={
-                "fields": "id,name,objective,status,daily_budget,lifetime_budget,start_time,stop_time",
-                "limit": params.limit
-            }
+            params=dict(_list_params(fields, params.limit))
         )
 
         campaigns = data.get("data", [])
@@ -814,31 +1568,14 @@ async def meta_ads_list_campaigns(params: ListCampaignsInput) -> str:
             return f"Nessuna campagna trovata per l'account {params.account_id}."
 
         if params.response_format == ResponseFormat.MARKDOWN:
-            lines = ["# Campagne Pubblicitarie\n"]
-            lines.append(f"Account: {params.account_id}")
-            lines.append(f"Trovate {len(campaigns)} campagne\n")
+            w = _BoundedWriter()
+            w.write(f"# Campagne Pubblicitarie\n\nAccount: {params.account_id}\nTrovate {len(campaigns)} campagne\n\n")
 
             for camp in campaigns:
-                lines.append(f"## {camp['name']} ({camp['id']})")
-                lines.append(f"- **Obiettivo**: {camp.get('objective', 'N/A')}")
-                lines.append(f"- **Stato**: {camp.get('status', 'N/A')}")
+                if not w.write(_CAMPAIGN_TMPL.format_map(_campaign_view(camp))):
+                    break
 
-                if 'daily_budget' in camp:
-                    budget = _format_currency(camp['daily_budget'])
-                    lines.append(f"- **Budget giornaliero**: {budget}")
-                elif 'lifetime_budget' in camp:
-                    budget = _format_currency(camp['lifetime_budget'])
-                    lines.append(f"- **Budget lifetime**: {budget}")
-
-                if 'start_time' in camp:
-                    lines.append(f"- **Inizio**: {camp['start_time']}")
-                if 'stop_time' in camp:
-                    lines.append(f"- **Fine**: {camp['stop_time']}")
-
-                lines.append("")
-
-            content = "\n".join(lines)
-            return _check_truncation(content, len(campaigns))
+            return w.getvalue()
 
         else:
             result = {
@@ -847,7 +1584,7 @@ async def meta_ads_list_campaigns(params: ListCampaignsInput) -> str:
                 "count": len(campaigns),
                 "campaigns": campaigns
             }
-            return json.dumps(result, indent=2)
+            return _to_json(result)
 
     except Exception as e:
         return _handle_api_error(e)
@@ -893,10 +1630,7 @@ async def meta_ads_list_adsets(params: ListAdSetsInput) -> str:
     try:
         data = await _make_api_request(
             f"{params.campaign_id}/adsets",
-            params={
-                "fields": "id,name,status,daily_budget,lifetime_budget,optimization_goal,billing_event,start_time,end_time",
-                "limit": params.limit
-            }
+            params=dict(_list_params("id,name,status,daily_budget,lifetime_budget,optimization_goal,billing_event,start_time,end_time", params.limit))
         )
 
         adsets = data.get("data", [])
@@ -905,35 +1639,14 @@ async def meta_ads_list_adsets(params: ListAdSetsInput) -> str:
             return f"Nessun ad set trovato per la campagna {params.campaign_id}."
 
         if params.response_format == ResponseFormat.MARKDOWN:
-            lines = ["# Ad Set\n"]
-            lines.append(f"Campagna: {params.campaign_id}")
-            lines.append(f"Trovati {len(adsets)} ad set\n")
+            w = _BoundedWriter()
+            w.write(f"# Ad Set\n\nCampagna: {params.campaign_id}\nTrovati {len(adsets)} ad set\n\n")
 
             for adset in adsets:
-                lines.append(f"## {adset['name']} ({adset['id']})")
-                lines.append(f"- **Stato**: {adset.get('status', 'N/A')}")
-
-                if 'daily_budget' in adset:
-                    budget = _format_currency(adset['daily_budget'])
-                    lines.append(f"- **Budget giornaliero**: {budget}")
-                elif 'lifetime_budget' in adset:
-                    budget = _format_currency(adset['lifetime_budget'])
-                    lines.append(f"- **Budget lifetime**: {budget}")
+                if not w.write(_ADSET_TMPL.format_map(_adset_view(adset))):
+                    break
 
-                if 'optimization_goal' in adset:
-                    lines.append(f"- **Ottimizzazione**: {adset['optimization_goal']}")
-                if 'billing_event' in adset:
-                    lines.append(f"- **Billing**: {adset['billing_event']}")
-
-                if 'start_time' in adset:
-                    lines.append(f"- **Inizio**: {adset['start_time']}")
-                if 'end_time' in adset:
-                    lines.append(f"- **Fine**: {adset['end_time']}")
-
-                lines.append("")
-
-            content = "\n".join(lines)
-            return _check_truncation(content, len(adsets))
+            return w.getvalue()
 
         else:
             result = {
@@ -942,7 +1655,7 @@ async def meta_ads_list_adsets(params: ListAdSetsInput) -> str:
                 "count": len(adsets),
                 "adsets": adsets
             }
-            return json.dumps(result, indent=2)
+            return _to_json(result)
 
     except Exception as e:
         return _handle_api_error(e)
@@ -990,10 +1703,7 @@ async def meta_ads_list_ads(params: ListAdsInput) -> str:
     try:
         data = await _make_api_request(
             f"{params.adset_id}/ads",
-            params={
-                "fields": "id,name,status,creative{id,name}",
-                "limit": params.limit
-            }
+            params=dict(_list_params("id,name,status,creative{id,name}", params.limit))
         )
 
         ads = data.get("data", [])
@@ -1002,24 +1712,14 @@ async def meta_ads_list_ads(params: ListAdsInput) -> str:
             return f"Nessun annuncio trovato per l'ad set {params.adset_id}."
 
         if params.response_format == ResponseFormat.MARKDOWN:
-            lines = ["# Annunci\n"]
-            lines.append(f"Ad Set: {params.adset_id}")
-            lines.append(f"Trovati {len(ads)} annunci\n")
+            w = _BoundedWriter()
+            w.write(f"# Annunci\n\nAd Set: {params.adset_id}\nTrovati {len(ads)} annunci\n\n")
 
             for ad in ads:
-                lines.append(f"## {ad['name']} ({ad['id']})")
-                lines.append(f"- **Stato**: {ad.get('status', 'N/A')}")
+                if not w.write(_AD_TMPL.format_map(_ad_view(ad))):
+                    break
 
-                if 'creative' in ad:
-                    creative = ad['creative']
-                    lines.append(f"- **Creative ID**: {creative.get('id', 'N/A')}")
-                    lines.append(f"- **Creative Nome**: {creative.get('name', 'N/A')}")
-
-                lines.append(f"- *Usa meta_ads_get_creative con ID {ad['id']} per dettagli completi*")
-                lines.append("")
-
-            content = "\n".join(lines)
-            return _check_truncation(content, len(ads))
+            return w.getvalue()
 
         else:
             result = {
@@ -1028,7 +1728,7 @@ async def meta_ads_list_ads(params: ListAdsInput) -> str:
                 "count": len(ads),
                 "ads": ads
             }
-            return json.dumps(result, indent=2)
+            return _to_json(result)
 
     except Exception as e:
         return _handle_api_error(e)
@@ -1102,14 +1802,10 @@ async def meta_ads_get_insights(params: GetInsightsInput) -> str:
 
         # Usa date personalizzate se fornite, altrimenti usa preset
         if params.since and params.until:
-            request_params["time_range"] = json.dumps({
-                "since": params.since,
-                "until": params.until
-            })
+            request_params["time_range"] = _time_range_json(params.since, params.until)
             date_info = f"{params.since} - {params.until}"
         else:
-            request_params["date_preset"] = params.date_preset.value
-            date_info = params.date_preset.value
+            date_info = request_params["date_preset"] = params.date_preset.value
 
         if params.time_increment:
             request_params["time_increment"] = params.time_increment
@@ -1125,42 +1821,20 @@ async def meta_ads_get_insights(params: GetInsightsInput) -> str:
             return f"Nessun dato insight disponibile per {params.object_id} nel periodo selezionato."
 
         if params.response_format == ResponseFormat.MARKDOWN:
-            lines = ["# Metriche Performance\n"]
-            lines.append(f"Oggetto: {params.object_id}")
-            lines.append(f"Periodo: {date_info}")
-            lines.append(f"Livello: {params.level}\n")
+            insights = _INSIGHT_ROWS.validate_python(insights)
+            w = _BoundedWriter()
+            w.write(f"# Metriche Performance\n\nOggetto: {params.object_id}\nPeriodo: {date_info}\nLivello: {params.level}\n\n")
 
             for idx, insight in enumerate(insights, 1):
                 if params.time_increment:
-                    period = f"{insight.get('date_start', 'N/A')} - {insight.get('date_stop', 'N/A')}"
-                    lines.append(f"## Periodo {idx}: {period}")
+                    title = f"Periodo {idx}: {insight.get('date_start', 'N/A')} - {insight.get('date_stop', 'N/A')}"
                 else:
-                    lines.append(f"## Metriche Totali")
-
-                lines.append(f"- **Impressions**: {insight.get('impressions', '0'):,}")
-                lines.append(f"- **Clicks**: {insight.get('clicks', '0'):,}")
-                lines.append(f"- **Spend**: {_format_currency(insight.get('spend', '0'))}")
-                lines.append(f"- **CPM**: {_format_currency(insight.get('cpm', '0'))}")
-                lines.append(f"- **CPC**: {_format_currency(insight.get('cpc', '0'))}")
-
-                ctr = insight.get('ctr', 0)
-                lines.append(f"- **CTR**: {_format_percentage(float(ctr))}")
-
-                lines.append(f"- **Reach**: {insight.get('reach', '0'):,}")
-                lines.append(f"- **Frequency**: {insight.get('frequency', '0')}")
+                    title = "Metriche Totali"
 
-                # Conversioni
-                if 'actions' in insight:
-                    lines.append("- **Conversioni**:")
-                    for action in insight['actions'][:5]:  # Primi 5 tipi
-                        action_type = action.get('action_type', 'unknown')
-                        value = action.get('value', '0')
-                        lines.append(f"  - {action_type}: {value}")
+                if not w.write(_INSIGHT_TMPL.format_map(_insight_view(insight, title))):
+                    break
 
-                lines.append("")
-
-            content = "\n".join(lines)
-            return _check_truncation(content, len(insights))
+            return w.getvalue()
 
         else:
             result = {
@@ -1170,7 +1844,7 @@ async def meta_ads_get_insights(params: GetInsightsInput) -> str:
                 "total": len(insights),
                 "insights": insights
             }
-            return json.dumps(result, indent=2)
+            return _to_json(result)
 
     except Exception as e:
         return _handle_api_error(e)
@@ -1227,7 +1901,7 @@ async def meta_ads_get_creative(params: GetCreativeInput) -> str:
         # Prima ottieni l'ad per ricavare il creative ID
         ad_data = await _make_api_request(
             params.ad_id,
-            params={"fields": "creative{id,name,title,body,image_url,link_url,call_to_action_type,object_story_spec,asset_feed_spec}"}
+            params={"fields": _CREATIVE_FIELDS}
         )
 
         if 'creative' not in ad_data:
@@ -1236,59 +1910,89 @@ async def meta_ads_get_creative(params: GetCreativeInput) -> str:
         creative = ad_data['creative']
 
         if params.response_format == ResponseFormat.MARKDOWN:
-            lines = ["# Dettagli Creative\n"]
-            lines.append(f"Annuncio ID: {params.ad_id}")
-            lines.append(f"Creative ID: {creative.get('id', 'N/A')}\n")
-
-            if 'name' in creative:
-                lines.append(f"## {creative['name']}\n")
-
-            if 'title' in creative:
-                lines.append(f"### Titolo")
-                lines.append(f"{creative['title']}\n")
-
-            if 'body' in creative:
-                lines.append(f"### Body Text")
-                lines.append(f"{creative['body']}\n")
-
-            if 'link_url' in creative:
-                lines.append(f"**Link**: {creative['link_url']}")
-
-            if 'call_to_action_type' in creative:
-                lines.append(f"**Call to Action**: {creative['call_to_action_type']}")
-
-            if 'image_url' in creative:
-                lines.append(f"**Immagine**: {creative['image_url']}")
-
-            # Object story spec
-            if 'object_story_spec' in creative:
-                lines.append("\n### Configurazione Placement")
-                spec = creative['object_story_spec']
-                if 'page_id' in spec:
-                    lines.append(f"- **Page ID**: {spec['page_id']}")
-                if 'instagram_actor_id' in spec:
-                    lines.append(f"- **Instagram Actor ID**: {spec['instagram_actor_id']}")
-                if 'link_data' in spec:
-                    link_data = spec['link_data']
-                    if 'link' in link_data:
-                        lines.append(f"- **Link**: {link_data['link']}")
-                    if 'message' in link_data:
-                        lines.append(f"- **Messaggio**: {link_data['message']}")
-
-            # Asset feed (per annunci dinamici)
-            if 'asset_feed_spec' in creative:
-                lines.append("\n### Asset Feed (Annuncio Dinamico)")
-                lines.append("*Configurazione per annunci dinamici presente*")
-
-            content = "\n".join(lines)
-            return content
+            buf = io.StringIO()
+            buf.write("# Dettagli Creative\n\n")
+            _write_creative(buf, params.ad_id, creative)
+            return buf.getvalue()
 
         else:
             result = {
                 "ad_id": params.ad_id,
                 "creative": creative
             }
-            return json.dumps(result, indent=2)
+            return _to_json(result)
+
+    except Exception as e:
+        return _handle_api_error(e)
+
+
+@mcp.tool(
+    name="meta_ads_get_creatives_bulk",
+    annotations={
+        "title": "Ottieni Creative di Più Annunci",
+        "readOnlyHint": True,
+        "destructiveHint": False,
+        "idempotentHint": True,
+        "openWorldHint": True
+    }
+)
+async def meta_ads_get_creatives_bulk(params: GetCreativesBulkInput) -> str:
+    """
+    Recupera i creative di più annunci con una sola richiesta alla Graph API.
+
+    Usa la lettura multi-ID della Graph API (?ids=a,b,c) invece di una
+    chiamata per annuncio: utile dopo meta_ads_list_ads per vedere testi e
+    link di tutti gli annunci di un ad set.
+
+    Args:
+        params (GetCreativesBulkInput): Parametri validati contenenti:
+            - ad_ids (List[str]): ID degli annunci (max 50)
+            - response_format (ResponseFormat): Formato output
+
+    Returns:
+        str: Per ogni annuncio, gli stessi dettagli di meta_ads_get_creative
+             (nell'ordine degli ID richiesti)
+
+    Esempi d'uso:
+        - "Mostrami i creative di tutti gli annunci di questo ad set"
+        - "Confronta i testi degli annunci 123 e 456"
+
+    Note:
+        - Se un ID non esiste la Graph API rifiuta l'intera richiesta
+        - Gli ID duplicati vengono richiesti una sola volta
+    """
+    try:
+        ad_ids = list(dict.fromkeys(params.ad_ids))
+        data = await _make_api_request(
+            "",
+            params={"ids": ",".join(ad_ids), "fields": _CREATIVE_FIELDS}
+        )
+
+        if params.response_format == ResponseFormat.MARKDOWN:
+            w = _BoundedWriter()
+            w.write(f"# Dettagli Creative\n\nRichiesti {len(ad_ids)} annunci\n\n")
+
+            for ad_id in ad_ids:
+                creative = data.get(ad_id, {}).get('creative')
+                buf = io.StringIO()
+                if creative is None:
+                    buf.write(f"Annuncio ID: {ad_id}\nNessun creative trovato.\n")
+                else:
+                    _write_creative(buf, ad_id, creative)
+                if not w.write(buf.getvalue().rstrip() + "\n\n---\n\n"):
+                    break
+
+            return w.getvalue()
+
+        else:
+            result = {
+                "count": len(ad_ids),
+                "creatives": [
+                    {"ad_id": ad_id, "creative": data.get(ad_id, {}).get('creative')}
+                    for ad_id in ad_ids
+                ]
+            }
+            return _to_json(result)
 
     except Exception as e:
         return _handle_api_error(e)
@@ -1326,9 +2030,11 @@ async def meta_ads_generate_report(params: GenerateReportInput) -> str:
             - date_preset (DatePreset): Periodo analisi preset (default: last_30d)
             - since (str): Data inizio custom (formato YYYY-MM-DD)
             - until (str): Data fine custom (formato YYYY-MM-DD)
+            - time_ranges (List[TimeRange]): Più periodi {since, until} da confrontare
             - response_format (ResponseFormat): Formato output
 
-        Note: Se specifichi 'since' e 'until', il 'date_preset' viene ignorato.
+        Note: Se specifichi 'since' e 'until', il 'date_preset' viene ignorato;
+        'time_ranges' ha priorità su entrambi.
 
     Returns:
         str: Report segmentato con metriche per ogni combinazione di breakdown:
@@ -1348,31 +2054,34 @@ async def meta_ads_generate_report(params: GenerateReportInput) -> str:
         - "Analizza la distribuzione per età dell'ultima settimana"
         - "Report per genere dal 1 dicembre al 31 dicembre 2024"
         - "Breakdown per paese dal 2025-01-01 al 2025-01-31"
+        - "Confronta le fasce d'età di questa settimana con la settimana scorsa"
 
     Note:
         - I breakdown multipli moltiplicano le righe (es. 6 età x 2 generi = 12 segmenti)
+        - Con time_ranges ogni segmento è ripetuto per periodo (date_start/date_stop)
         - Alcuni breakdown non sono compatibili tra loro
         - Dati limitati a 394 giorni per breakdown demografici con Reach
         - Segmenti con pochi dati potrebbero non essere mostrati per privacy
     """
     try:
-        breakdown_str = ",".join([b.value for b in params.breakdowns])
+        breakdown_str = _breakdown_csv(tuple(params.breakdowns))
 
         request_params = {
             "fields": "impressions,clicks,spend,cpc,ctr,reach,actions,cost_per_action_type",
             "breakdowns": breakdown_str
         }
 
-        # Usa date personalizzate se fornite, altrimenti usa preset
-        if params.since and params.until:
-            request_params["time_range"] = json.dumps({
-                "since": params.since,
-                "until": params.until
-            })
+        # Più periodi in una sola richiesta, poi date personalizzate, infine preset
+        if params.time_ranges:
+            request_params["time_ranges"] = orjson.dumps(
+                [{"since": r.since, "until": r.until} for r in params.time_ranges]
+            ).decode()
+            date_info = ", ".join(f"{r.since} - {r.until}" for r in params.time_ranges)
+        elif params.since and params.until:
+            request_params["time_range"] = _time_range_json(params.since, params.until)
             date_info = f"{params.since} - {params.until}"
         else:
-            request_params["date_preset"] = params.date_preset.value
-            date_info = params.date_preset.value
+            date_info = request_params["date_preset"] = params.date_preset.value
 
         data = await _make_api_request(
             f"{params.object_id}/insights",
@@ -1385,58 +2094,27 @@ async def meta_ads_generate_report(params: GenerateReportInput) -> str:
             return f"Nessun dato disponibile per i breakdown richiesti nel periodo {date_info}."
 
         if params.response_format == ResponseFormat.MARKDOWN:
-            lines = ["# Report con Breakdown\n"]
-            lines.append(f"Oggetto: {params.object_id}")
-            lines.append(f"Periodo: {date_info}")
-            lines.append(f"Breakdown: {breakdown_str}\n")
-            lines.append(f"Totale segmenti: {len(insights)}\n")
-
-            # Raggruppa e mostra top performers
-            sorted_insights = sorted(insights, key=lambda x: int(x.get('clicks', 0)), reverse=True)
-
-            for idx, insight in enumerate(sorted_insights[:20], 1):  # Top 20
-                # Costruisci il titolo del segmento
-                segment_parts = []
-                if 'age' in insight:
-                    segment_parts.append(f"Età: {insight['age']}")
-                if 'gender' in insight:
-                    gender_map = {'male': 'Uomo', 'female': 'Donna', 'unknown': 'Non specificato'}
-                    segment_parts.append(f"Genere: {gender_map.get(insight['gender'], insight['gender'])}")
-                if 'country' in insight:
-                    segment_parts.append(f"Paese: {insight['country']}")
-                if 'region' in insight:
-                    segment_parts.append(f"Regione: {insight['region']}")
-                if 'publisher_platform' in insight:
-                    segment_parts.append(f"Platform: {insight['publisher_platform']}")
-                if 'device_platform' in insight:
-                    segment_parts.append(f"Device: {insight['device_platform']}")
-
-                segment_title = " | ".join(segment_parts) if segment_parts else f"Segmento {idx}"
-                lines.append(f"## {idx}. {segment_title}")
-
-                lines.append(f"- **Impressions**: {insight.get('impressions', '0'):,}")
-                lines.append(f"- **Clicks**: {insight.get('clicks', '0'):,}")
-                lines.append(f"- **Spend**: {_format_currency(insight.get('spend', '0'))}")
-
-                ctr = float(insight.get('ctr', 0))
-                lines.append(f"- **CTR**: {_format_percentage(ctr)}")
-                lines.append(f"- **CPC**: {_format_currency(insight.get('cpc', '0'))}")
-
-                if 'reach' in insight:
-                    lines.append(f"- **Reach**: {insight['reach']:,}")
-
-                if 'actions' in insight:
-                    total_actions = sum(int(a.get('value', 0)) for a in insight['actions'])
-                    lines.append(f"- **Conversioni totali**: {total_actions}")
-
-                lines.append("")
-
-            if len(sorted_insights) > 20:
-                lines.append(f"\n*Mostrati i top 20 segmenti su {len(insights)} totali*")
-                lines.append("*Usa filtri o parametri diversi per vedere altri segmenti*\n")
-
-            content = "\n".join(lines)
-            return _check_truncation(content, len(insights))
+            insights = _INSIGHT_ROWS.validate_python(insights)
+            w = _BoundedWriter()
+            w.write(
+                f"# Report con Breakdown\n\nOggetto: {params.object_id}\nPeriodo: {date_info}\n"
+                f"Breakdown: {breakdown_str}\n\nTotale segmenti: {len(insights)}\n\n"
+            )
+
+            # Mostra i top 20 segmenti per click (ordinamento parziale)
+            top_insights = heapq.nlargest(20, insights, key=lambda x: x.get('clicks', 0))
+
+            for idx, insight in enumerate(top_insights, 1):
+                if not w.write(_SEGMENT_TMPL.format_map(_segment_view(insight, idx, bool(params.time_ranges)))):
+                    break
+
+            if len(insights) > 20:
+                w.write(
+                    f"\n*Mostrati i top 20 segmenti su {len(insights)} totali*\n"
+                    "*Usa filtri o parametri diversi per vedere altri segmenti*\n"
+                )
+
+            return w.getvalue()
 
         else:
             result = {
@@ -1446,7 +2124,7 @@ async def meta_ads_generate_report(params: GenerateReportInput) -> str:
                 "total_segments": len(insights),
                 "insights": insights
             }
-            return json.dumps(result, indent=2)
+            return _to_json(result)
 
     except Exception as e:
         return _handle_api_error(e)
@@ -1496,39 +2174,38 @@ async def meta_ads_update_adset_targeting(params: UpdateAdSetTargetingInput) ->
         # Prima recupera il targeting attuale
         current_data = await _make_api_request(
             params.adset_id,
-            params={"fields": "name,targeting"}
+            params={"fields": "name,targeting"},
+            use_cache=False
         )
 
         current_targeting = current_data.get('targeting', {})
         adset_name = current_data.get('name', params.adset_id)
 
-        # Prepara il nuovo targeting (mantiene le altre impostazioni)
-        updated_targeting = current_targeting.copy()
-
-        # Aggiorna età se specificata
+        # Solo i campi demografici richiesti; le altre impostazioni restano invariate
+        delta = {}
         if params.age_min is not None:
-            updated_targeting['age_min'] = params.age_min
+            delta['age_min'] = params.age_min
         if params.age_max is not None:
-            updated_targeting['age_max'] = params.age_max
-
-        # Aggiorna genere se specificato
+            delta['age_max'] = params.age_max
         if params.genders is not None:
-            updated_targeting['genders'] = params.genders
-        elif 'genders' in updated_targeting:
+            delta['genders'] = params.genders
+
+        updated_targeting = {**current_targeting, **delta}
+        if params.genders is None:
             # Se genders non è specificato, rimuovilo per targettizzare tutti
-            del updated_targeting['genders']
+            updated_targeting.pop('genders', None)
 
         # Esegui l'aggiornamento
         update_data = await _make_api_request(
             params.adset_id,
             method="POST",
             params={
-                "targeting": json.dumps(updated_targeting)
+                "targeting": orjson.dumps(updated_targeting).decode()
             }
         )
 
         if not update_data.get('success'):
-            return f"Errore nell'aggiornamento dell'ad set {params.adset_id}"
+            return _ADSET_UPDATE_ERRORS["targeting"] % params.adset_id
 
         if params.response_format == ResponseFormat.MARKDOWN:
             lines = ["# ✅ Targeting Ad Set Aggiornato\n"]
@@ -1545,11 +2222,10 @@ async def meta_ads_update_adset_targeting(params: UpdateAdSetTargetingInput) ->
             # Genere
             genders = updated_targeting.get('genders')
             if genders:
-                gender_map = {1: 'Uomini', 2: 'Donne'}
-                gender_str = ', '.join([gender_map.get(g, str(g)) for g in genders])
+                gender_str = _genders_text(genders)
                 lines.append(f"- **Genere**: {gender_str}")
             else:
-                lines.append(f"- **Genere**: Tutti")
+                lines.append("- **Genere**: Tutti")
 
             # Mostra cosa è cambiato
             changes = []
@@ -1580,12 +2256,89 @@ async def meta_ads_update_adset_targeting(params: UpdateAdSetTargetingInput) ->
                 "adset_name": adset_name,
                 "updated_targeting": updated_targeting
             }
-            return json.dumps(result, indent=2)
+            return _to_json(result)
 
     except Exception as e:
         return _handle_api_error(e)
 
 
+def _render_budget_md(result: Dict[str, Any], current_data: Dict[str, Any]) -> str:
+    """Riepilogo Markdown di meta_ads_update_adset_budget."""
+    old_budget = result["old_budget_cents"]
+    new_budget = result["new_budget_cents"]
+    diff = result["difference_cents"]
+
+    if diff:
+        # Variazione percentuale in decimi, arrotondata con aritmetica intera
+        pct = (abs(diff) * 2000 + old_budget) // (2 * old_budget) if old_budget > 0 else 0
+        sign, trend = ("+", "📈") if diff > 0 else ("-", "📉")
+        variation = (
+            f"- **Variazione**: {'+' if diff > 0 else ''}€{_eur(diff)} "
+            f"({sign}{pct // 10}.{pct % 10}%) {trend}"
+        )
+    else:
+        variation = "- **Variazione**: Nessuna modifica"
+
+    return "\n".join((
+        "# ✅ Budget Ad Set Aggiornato\n",
+        f"**Ad Set**: {result['adset_name']}",
+        f"**ID**: {result['adset_id']}",
+        f"**Status**: {current_data.get('status', 'UNKNOWN')}\n",
+        "## Modifica Budget\n",
+        f"- **Budget Precedente**: €{_eur(old_budget)}/giorno",
+        f"- **Nuovo Budget**: €{_eur(new_budget)}/giorno",
+        variation,
+        "\n*Il nuovo budget sarà applicato a partire dalla prossima auction*"
+    ))
+
+
+def _render_status_md(result: Dict[str, Any], current_data: Dict[str, Any]) -> str:
+    """Riepilogo Markdown di meta_ads_update_adset_status."""
+    if result["new_status"] == AdSetStatus.ACTIVE.value:
+        outcome = (
+            "\n✅ **L'ad set è ora ATTIVO** e sta competendo nelle auction.",
+            "Gli annunci inizieranno a essere mostrati in base al targeting configurato."
+        )
+    else:
+        outcome = (
+            "\n⏸️ **L'ad set è ora IN PAUSA** e non sta spendendo budget.",
+            "Gli annunci non verranno mostrati finché non riattiverai l'ad set."
+        )
+
+    return "\n".join((
+        "# ✅ Stato Ad Set Modificato\n",
+        f"**Ad Set**: {result['adset_name']}",
+        f"**ID**: {result['adset_id']}",
+        f"**Budget**: €{_eur(_coerce_budget(current_data.get('daily_budget')))}/giorno\n",
+        "## Cambio Stato\n",
+        f"- **Stato Precedente**: {result['old_status']}",
+        f"- **Nuovo Stato**: {result['new_status']}",
+        *outcome
+    ))
+
+
+def _render_status_unchanged_md(result: Dict[str, Any], current_data: Dict[str, Any]) -> str:
+    """Risposta Markdown di meta_ads_update_adset_status quando lo stato non cambia."""
+    return (
+        f"# ℹ️ Nessuna Modifica Necessaria\n\n"
+        f"L'ad set **{result['adset_name']}** è già nello stato **{result['status']}**."
+    )
+
+
+def _render_json(result: Dict[str, Any], current_data: Dict[str, Any]) -> str:
+    """Output JSON dei tool di aggiornamento: il risultato così com'è."""
+    return _to_json(result)
+
+
+# Renderer per formato di risposta dei tool di aggiornamento dell'ad set
+_BUDGET_RENDERERS = {ResponseFormat.MARKDOWN: _render_budget_md, ResponseFormat.JSON: _render_json}
+_STATUS_RENDERERS = {ResponseFormat.MARKDOWN: _render_status_md, ResponseFormat.JSON: _render_json}
+_STATUS_UNCHANGED_RENDERERS = {
+    ResponseFormat.MARKDOWN: _render_status_unchanged_md,
+    ResponseFormat.JSON: _render_json
+}
+
+
 @mcp.tool(
     name="meta_ads_update_adset_budget",
     annotations={
@@ -1624,62 +2377,25 @@ async def meta_ads_update_adset_budget(params: UpdateAdSetBudgetInput) -> str:
         - Non cambia il lifetime_budget se configurato
     """
     try:
-        # Prima recupera i dati attuali
-        current_data = await _make_api_request(
-            params.adset_id,
-            params={"fields": "name,daily_budget,status"}
-        )
-
-        adset_name = current_data.get('name', params.adset_id)
-        old_budget = int(current_data.get('daily_budget', 0))
-        status = current_data.get('status', 'UNKNOWN')
-
-        # Esegui l'aggiornamento
-        update_data = await _make_api_request(
+        # Esegui l'aggiornamento, recuperando i dati precedenti da mostrare
+        current_data, update_data = await _update_adset(
             params.adset_id,
-            method="POST",
-            params={
-                "daily_budget": params.daily_budget
-            }
+            {"daily_budget": params.daily_budget}
         )
 
         if not update_data.get('success'):
-            return f"Errore nell'aggiornamento del budget per ad set {params.adset_id}"
-
-        if params.response_format == ResponseFormat.MARKDOWN:
-            lines = ["# ✅ Budget Ad Set Aggiornato\n"]
-            lines.append(f"**Ad Set**: {adset_name}")
-            lines.append(f"**ID**: {params.adset_id}")
-            lines.append(f"**Status**: {status}\n")
-
-            lines.append("## Modifica Budget\n")
-            lines.append(f"- **Budget Precedente**: €{old_budget/100:.2f}/giorno")
-            lines.append(f"- **Nuovo Budget**: €{params.daily_budget/100:.2f}/giorno")
-
-            diff = params.daily_budget - old_budget
-            diff_pct = (diff / old_budget * 100) if old_budget > 0 else 0
-
-            if diff > 0:
-                lines.append(f"- **Variazione**: +€{diff/100:.2f} (+{diff_pct:.1f}%) 📈")
-            elif diff < 0:
-                lines.append(f"- **Variazione**: €{diff/100:.2f} ({diff_pct:.1f}%) 📉")
-            else:
-                lines.append(f"- **Variazione**: Nessuna modifica")
-
-            lines.append("\n*Il nuovo budget sarà applicato a partire dalla prossima auction*")
-
-            return "\n".join(lines)
-
-        else:
-            result = {
-                "success": True,
-                "adset_id": params.adset_id,
-                "adset_name": adset_name,
-                "old_budget_cents": old_budget,
-                "new_budget_cents": params.daily_budget,
-                "difference_cents": params.daily_budget - old_budget
-            }
-            return json.dumps(result, indent=2)
+            return _ADSET_UPDATE_ERRORS["budget"] % params.adset_id
+
+        old_budget = _coerce_budget(current_data.get('daily_budget'))
+        result = {
+            "success": True,
+            "adset_id": params.adset_id,
+            "adset_name": current_data.get('name', params.adset_id),
+            "old_budget_cents": old_budget,
+            "new_budget_cents": params.daily_budget,
+            "difference_cents": params.daily_budget - old_budget
+        }
+        return _BUDGET_RENDERERS[params.response_format](result, current_data)
 
     except Exception as e:
         return _handle_api_error(e)
@@ -1723,72 +2439,49 @@ async def meta_ads_update_adset_status(params: UpdateAdSetStatusInput) -> str:
         - La campagna deve essere attiva perché l'ad set possa essere attivo
     """
     try:
-        # Prima recupera i dati attuali
-        current_data = await _make_api_request(
-            params.adset_id,
-            params={"fields": "name,status,daily_budget"}
-        )
+        new_status = params.status.value
 
-        adset_name = current_data.get('name', params.adset_id)
-        old_status = current_data.get('status', 'UNKNOWN')
-        budget = int(current_data.get('daily_budget', 0))
+        current_data = _ADSET_META_CACHE.get(params.adset_id)
+        if current_data is None or current_data.get('status') == new_status:
+            # Leggi lo stato attuale se non è in cache, o confermalo con una lettura
+            # fresca prima di saltare la scrittura (Ads Manager potrebbe averlo cambiato):
+            # se è già quello richiesto non va inviata nessuna POST
+            current_data = await _get_adset_meta(params.adset_id, refresh=True)
 
-        # Se lo stato è già quello richiesto, comunica che non serve modificare
-        if old_status == params.status.value:
-            if params.response_format == ResponseFormat.MARKDOWN:
-                return f"# ℹ️ Nessuna Modifica Necessaria\n\nL'ad set **{adset_name}** è già nello stato **{params.status.value}**."
-            else:
-                result = {
-                    "success": True,
-                    "adset_id": params.adset_id,
-                    "adset_name": adset_name,
-                    "status": params.status.value,
-                    "changed": False,
-                    "message": "Ad set già nello stato richiesto"
-                }
-                return json.dumps(result, indent=2)
+        if current_data.get('status') != new_status:
+            # Esegui l'aggiornamento (i dati attuali sono già in cache: solo la POST)
+            current_data, update_data = await _update_adset(
+                params.adset_id,
+                {"status": new_status}
+            )
 
-        # Esegui l'aggiornamento
-        update_data = await _make_api_request(
-            params.adset_id,
-            method="POST",
-            params={
-                "status": params.status.value
-            }
-        )
-
-        if not update_data.get('success'):
-            return f"Errore nel cambio stato per ad set {params.adset_id}"
-
-        if params.response_format == ResponseFormat.MARKDOWN:
-            lines = ["# ✅ Stato Ad Set Modificato\n"]
-            lines.append(f"**Ad Set**: {adset_name}")
-            lines.append(f"**ID**: {params.adset_id}")
-            lines.append(f"**Budget**: €{budget/100:.2f}/giorno\n")
-
-            lines.append("## Cambio Stato\n")
-            lines.append(f"- **Stato Precedente**: {old_status}")
-            lines.append(f"- **Nuovo Stato**: {params.status.value}")
-
-            if params.status == AdSetStatus.ACTIVE:
-                lines.append("\n✅ **L'ad set è ora ATTIVO** e sta competendo nelle auction.")
-                lines.append("Gli annunci inizieranno a essere mostrati in base al targeting configurato.")
-            else:
-                lines.append("\n⏸️ **L'ad set è ora IN PAUSA** e non sta spendendo budget.")
-                lines.append("Gli annunci non verranno mostrati finché non riattiverai l'ad set.")
+            if not update_data.get('success'):
+                return _ADSET_UPDATE_ERRORS["status"] % params.adset_id
 
-            return "\n".join(lines)
+        adset_name = current_data.get('name', params.adset_id)
+        old_status = current_data.get('status', 'UNKNOWN')
 
-        else:
+        # Se lo stato era già quello richiesto, comunica che non serve modificare
+        if old_status == new_status:
             result = {
                 "success": True,
                 "adset_id": params.adset_id,
                 "adset_name": adset_name,
-                "old_status": old_status,
-                "new_status": params.status.value,
-                "changed": True
+                "status": new_status,
+                "changed": False,
+                "message": "Ad set già nello stato richiesto"
             }
-            return json.dumps(result, indent=2)
+            return _STATUS_UNCHANGED_RENDERERS[params.response_format](result, current_data)
+
+        result = {
+            "success": True,
+            "adset_id": params.adset_id,
+            "adset_name": adset_name,
+            "old_status": old_status,
+            "new_status": new_status,
+            "changed": True
+        }
+        return _STATUS_RENDERERS[params.response_format](result, current_data)
 
     except Exception as e:
         return _handle_api_error(e)
@@ -1839,22 +2532,28 @@ async def meta_ads_create_campaign(params: CreateCampaignInput) -> str:
         - Per categorie speciali (credito, lavoro, casa, politica) devi specificare special_ad_categories
     """
     try:
+        # Valori usati più volte tra richiesta e output
+        objective = params.objective.value
+        status = params.status.value
+        daily_budget = params.daily_budget
+        lifetime_budget = params.lifetime_budget
+
         # Prepara i parametri della campagna
         campaign_params = {
             "name": params.name,
-            "objective": params.objective.value,
-            "status": params.status.value
+            "objective": objective,
+            "status": status
         }
 
         # Aggiungi budget (solo uno dei due)
-        if params.daily_budget is not None:
-            campaign_params["daily_budget"] = params.daily_budget
-        elif params.lifetime_budget is not None:
-            campaign_params["lifetime_budget"] = params.lifetime_budget
+        if daily_budget is not None:
+            campaign_params["daily_budget"] = daily_budget
+        elif lifetime_budget is not None:
+            campaign_params["lifetime_budget"] = lifetime_budget
 
         # Aggiungi categorie speciali se presenti
         if params.special_ad_categories:
-            campaign_params["special_ad_categories"] = json.dumps(params.special_ad_categories)
+            campaign_params["special_ad_categories"] = orjson.dumps(params.special_ad_categories).decode()
 
         # Crea la campagna
         endpoint = f"{params.account_id}/campaigns"
@@ -1869,33 +2568,37 @@ async def meta_ads_create_campaign(params: CreateCampaignInput) -> str:
             return "Errore: Campagna non creata. Verifica i parametri."
 
         if params.response_format == ResponseFormat.MARKDOWN:
-            lines = ["# ✅ Campagna Creata con Successo\n"]
-            lines.append(f"**Nome**: {params.name}")
-            lines.append(f"**ID**: {campaign_id}")
-            lines.append(f"**Account**: {params.account_id}\n")
-
-            lines.append("## Configurazione\n")
-            lines.append(f"- **Obiettivo**: {params.objective.value}")
-            lines.append(f"- **Stato**: {params.status.value}")
-
-            if params.daily_budget:
-                lines.append(f"- **Budget Giornaliero**: €{params.daily_budget/100:.2f}")
-            elif params.lifetime_budget:
-                lines.append(f"- **Budget Lifetime**: €{params.lifetime_budget/100:.2f}")
+            if daily_budget:
+                config_lines = (f"- **Budget Giornaliero**: €{_eur(daily_budget)}",)
+            elif lifetime_budget:
+                config_lines = (f"- **Budget Lifetime**: €{_eur(lifetime_budget)}",)
+            else:
+                config_lines = ()
 
             if params.special_ad_categories:
-                lines.append(f"- **Categorie Speciali**: {', '.join(params.special_ad_categories)}")
-
-            lines.append("\n## Prossimi Passi\n")
-            lines.append("1. ✅ Campagna creata")
-            lines.append(f"2. ⏭️ Crea ad set con `meta_ads_create_adset` usando campaign_id: {campaign_id}")
-            lines.append("3. ⏭️ Crea annunci nell'ad set")
-            lines.append(f"4. ⏭️ Attiva la campagna con `meta_ads_update_campaign_status` quando pronto")
-
-            if params.status == CampaignStatus.PAUSED:
-                lines.append("\n⏸️ *La campagna è in stato PAUSED. Configurala completamente prima di attivarla.*")
-
-            return "\n".join(lines)
+                config_lines += (f"- **Categorie Speciali**: {', '.join(params.special_ad_categories)}",)
+
+            cfg_block = f"- **Obiettivo**: {objective}\n- **Stato**: {status}"
+            paused_note = (
+                ("\n⏸️ *La campagna è in stato PAUSED. Configurala completamente prima di attivarla.*",)
+                if params.status == CampaignStatus.PAUSED else ()
+            )
+
+            return "\n".join((
+                _MD_CAMPAIGN_HEADER,
+                f"**Nome**: {params.name}",
+                f"**ID**: {campaign_id}",
+                f"**Account**: {params.account_id}\n",
+                _MD_CONFIG,
+                cfg_block,
+                *config_lines,
+                _MD_NEXT_STEPS,
+                "1. ✅ Campagna creata",
+                f"2. ⏭️ Crea ad set con `meta_ads_create_adset` usando campaign_id: {campaign_id}",
+                "3. ⏭️ Crea annunci nell'ad set",
+                "4. ⏭️ Attiva la campagna con `meta_ads_update_campaign_status` quando pronto",
+                *paused_note
+            ))
 
         else:
             result_data = {
@@ -1903,14 +2606,14 @@ async def meta_ads_create_campaign(params: CreateCampaignInput) -> str:
                 "campaign_id": campaign_id,
                 "campaign_name": params.name,
                 "account_id": params.account_id,
-                "objective": params.objective.value,
-                "status": params.status.value
+                "objective": objective,
+                "status": status
             }
-            if params.daily_budget:
-                result_data["daily_budget"] = params.daily_budget
-            if params.lifetime_budget:
-                result_data["lifetime_budget"] = params.lifetime_budget
-            return json.dumps(result_data, indent=2)
+            if daily_budget:
+                result_data["daily_budget"] = daily_budget
+            if lifetime_budget:
+                result_data["lifetime_budget"] = lifetime_budget
+            return _to_json(result_data)
 
     except Exception as e:
         return _handle_api_error(e)
@@ -1937,6 +2640,7 @@ async def meta_ads_create_adset(params: CreateAdSetInput) -> str:
     Args:
         params (CreateAdSetInput): Parametri validati contenenti:
             - campaign_id (str): ID campagna a cui associare l'ad set
+            - account_id (Optional[str]): Account della campagna; se omesso viene ricavato con una lettura
             - name (str): Nome dell'ad set (1-400 caratteri)
             - optimization_goal (OptimizationGoal): Obiettivo ottimizzazione (REACH, IMPRESSIONS,
               LINK_CLICKS, LANDING_PAGE_VIEWS, OFFSITE_CONVERSIONS, QUALITY_LEAD, VALUE, THRUPLAY)
@@ -1970,25 +2674,33 @@ async def meta_ads_create_adset(params: CreateAdSetInput) -> str:
         - Dopo la creazione, dovrai creare almeno un annuncio nell'ad set
     """
     try:
+        # Valori usati più volte tra richiesta e output
+        optimization_goal = params.optimization_goal.value
+        billing_event = params.billing_event.value
+        status = params.status.value
+        bid_amount = params.bid_amount
+        daily_budget = params.daily_budget
+        lifetime_budget = params.lifetime_budget
+
         # Prepara i parametri dell'ad set
         adset_params = {
             "name": params.name,
             "campaign_id": params.campaign_id,
-            "optimization_goal": params.optimization_goal.value,
-            "billing_event": params.billing_event.value,
-            "targeting": json.dumps(params.targeting),
-            "status": params.status.value
+            "optimization_goal": optimization_goal,
+            "billing_event": billing_event,
+            "targeting": orjson.dumps(params.targeting).decode(),
+            "status": status
         }
 
         # Aggiungi bid amount se specificato
-        if params.bid_amount is not None:
-            adset_params["bid_amount"] = params.bid_amount
+        if bid_amount is not None:
+            adset_params["bid_amount"] = bid_amount
 
         # Aggiungi budget se specificato (opzionale se già impostato a livello campagna)
-        if params.daily_budget is not None:
-            adset_params["daily_budget"] = params.daily_budget
-        elif params.lifetime_budget is not None:
-            adset_params["lifetime_budget"] = params.lifetime_budget
+        if daily_budget is not None:
+            adset_params["daily_budget"] = daily_budget
+        elif lifetime_budget is not None:
+            adset_params["lifetime_budget"] = lifetime_budget
 
         # Aggiungi scheduling se specificato
         if params.start_time:
@@ -1996,14 +2708,8 @@ async def meta_ads_create_adset(params: CreateAdSetInput) -> str:
         if params.end_time:
             adset_params["end_time"] = params.end_time
 
-        # Recupera l'account_id dalla campagna
-        campaign_fields = await _make_api_request(
-            params.campaign_id,
-            params={"fields": "account_id"}
-        )
-        account_id = campaign_fields.get('account_id', '')
-        if not account_id.startswith('act_'):
-            account_id = f'act_{account_id}'
+        # Recupera l'account_id dalla campagna, se non fornito
+        account_id = params.account_id or await _resolve_account_id(params.campaign_id)
 
         # Crea l'ad set usando l'account_id
         endpoint = f"{account_id}/adsets"
@@ -2018,64 +2724,72 @@ async def meta_ads_create_adset(params: CreateAdSetInput) -> str:
             return "Errore: Ad set non creato. Verifica i parametri."
 
         if params.response_format == ResponseFormat.MARKDOWN:
-            lines = ["# ✅ Ad Set Creato con Successo\n"]
-            lines.append(f"**Nome**: {params.name}")
-            lines.append(f"**ID**: {adset_id}")
-            lines.append(f"**Campagna**: {params.campaign_id}\n")
-
-            lines.append("## Configurazione\n")
-            lines.append(f"- **Obiettivo Ottimizzazione**: {params.optimization_goal.value}")
-            lines.append(f"- **Evento Fatturazione**: {params.billing_event.value}")
-            lines.append(f"- **Stato**: {params.status.value}")
-
-            if params.bid_amount:
-                lines.append(f"- **Bid Amount**: €{params.bid_amount/100:.2f}")
-
-            if params.daily_budget:
-                lines.append(f"- **Budget Giornaliero**: €{params.daily_budget/100:.2f}")
-            elif params.lifetime_budget:
-                lines.append(f"- **Budget Lifetime**: €{params.lifetime_budget/100:.2f}")
-
-            lines.append("\n## Targeting\n")
+            buf = io.StringIO()
+            w = buf.write
+            w(_MD_ADSET_HEADER)
+            w(f"\n**Nome**: {params.name}\n")
+            w(f"**ID**: {adset_id}\n")
+            w(f"**Campagna**: {params.campaign_id}\n\n")
+
+            w(_MD_CONFIG)
+            w(
+                f"\n- **Obiettivo Ottimizzazione**: {optimization_goal}\n"
+                f"- **Evento Fatturazione**: {billing_event}\n"
+                f"- **Stato**: {status}\n"
+            )
+
+            if bid_amount:
+                w(f"- **Bid Amount**: €{_eur(bid_amount)}\n")
+
+            if daily_budget:
+                w(f"- **Budget Giornaliero**: €{_eur(daily_budget)}\n")
+            elif lifetime_budget:
+                w(f"- **Budget Lifetime**: €{_eur(lifetime_budget)}\n")
+
+            w("\n## Targeting\n\n")
             targeting = params.targeting
 
+            # Estrai una sola volta i campi mostrati nel riepilogo
+            geo = targeting.get('geo_locations') or {}
+            countries = geo.get('countries')
+            regions = geo.get('regions')
+            cities = geo.get('cities')
+            age_min = targeting.get('age_min')
+            age_max = targeting.get('age_max')
+            genders = targeting.get('genders')
+
             # Geo targeting
-            geo = targeting.get('geo_locations', {})
-            if 'countries' in geo:
-                lines.append(f"- **Paesi**: {', '.join(geo['countries'])}")
-            if 'regions' in geo:
-                lines.append(f"- **Regioni**: {len(geo['regions'])} regioni")
-            if 'cities' in geo:
-                lines.append(f"- **Città**: {len(geo['cities'])} città")
+            if countries is not None:
+                w(f"- **Paesi**: {', '.join(countries)}\n")
+            if regions is not None:
+                w(f"- **Regioni**: {len(regions)} regioni\n")
+            if cities is not None:
+                w(f"- **Città**: {len(cities)} città\n")
 
             # Demographic targeting
-            if 'age_min' in targeting or 'age_max' in targeting:
-                age_min = targeting.get('age_min', 18)
-                age_max = targeting.get('age_max', 65)
-                lines.append(f"- **Età**: {age_min}-{age_max} anni")
+            if age_min is not None or age_max is not None:
+                w(f"- **Età**: {18 if age_min is None else age_min}-{65 if age_max is None else age_max} anni\n")
 
-            if 'genders' in targeting:
-                gender_map = {1: 'Uomini', 2: 'Donne'}
-                genders_str = ', '.join([gender_map.get(g, str(g)) for g in targeting['genders']])
-                lines.append(f"- **Genere**: {genders_str}")
+            if genders is not None:
+                w(f"- **Genere**: {_genders_text(genders)}\n")
 
             # Scheduling
             if params.start_time or params.end_time:
-                lines.append("\n## Scheduling\n")
+                w("\n## Scheduling\n\n")
                 if params.start_time:
-                    lines.append(f"- **Inizio**: {params.start_time}")
+                    w(f"- **Inizio**: {params.start_time}\n")
                 if params.end_time:
-                    lines.append(f"- **Fine**: {params.end_time}")
+                    w(f"- **Fine**: {params.end_time}\n")
 
-            lines.append("\n## Prossimi Passi\n")
-            lines.append("1. ✅ Ad set creato")
-            lines.append(f"2. ⏭️ Crea annunci nell'ad set {adset_id}")
-            lines.append("3. ⏭️ Attiva l'ad set con `meta_ads_update_adset_status` quando pronto")
+            w(_MD_NEXT_STEPS)
+            w("\n1. ✅ Ad set creato\n")
+            w(f"2. ⏭️ Crea annunci nell'ad set {adset_id}\n")
+            w("3. ⏭️ Attiva l'ad set con `meta_ads_update_adset_status` quando pronto")
 
             if params.status == AdSetStatus.PAUSED:
-                lines.append("\n⏸️ *L'ad set è in stato PAUSED. Crea gli annunci prima di attivarlo.*")
+                w("\n\n⏸️ *L'ad set è in stato PAUSED. Crea gli annunci prima di attivarlo.*")
 
-            return "\n".join(lines)
+            return buf.getvalue()
 
         else:
             result_data = {
@@ -2083,18 +2797,18 @@ async def meta_ads_create_adset(params: CreateAdSetInput) -> str:
                 "adset_id": adset_id,
                 "adset_name": params.name,
                 "campaign_id": params.campaign_id,
-                "optimization_goal": params.optimization_goal.value,
-                "billing_event": params.billing_event.value,
-                "status": params.status.value,
+                "optimization_goal": optimization_goal,
+                "billing_event": billing_event,
+                "status": status,
                 "targeting": params.targeting
             }
-            if params.bid_amount:
-                result_data["bid_amount"] = params.bid_amount
-            if params.daily_budget:
-                result_data["daily_budget"] = params.daily_budget
-            if params.lifetime_budget:
-                result_data["lifetime_budget"] = params.lifetime_budget
-            return json.dumps(result_data, indent=2)
+            if bid_amount:
+                result_data["bid_amount"] = bid_amount
+            if daily_budget:
+                result_data["daily_budget"] = daily_budget
+            if lifetime_budget:
+                result_data["lifetime_budget"] = lifetime_budget
+            return _to_json(result_data)
 
     except Exception as e:
         return _handle_api_error(e)
@@ -0,0 +1,56 @@
+"""Configurazione comune dei test: token fittizio e Graph API simulata."""
+
+import os
+import sys
+from pathlib import Path
+from typing import Callable, List
+
+import httpx
+import pytest
+
+# Il token viene letto all'import del modulo: va impostato prima
+os.environ.setdefault("META_ACCESS_TOKEN", "test-token")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import meta_ads_mcp as m  # noqa: E402
+
+
+class GraphMock:
+    """Sostituisce la Graph API con un handler httpx.MockTransport e registra le richieste."""
+
+    def __init__(self) -> None:
+        self.requests: List[httpx.Request] = []
+        self.delays: List[float] = []
+        self.handler: Callable[[httpx.Request], httpx.Response] = (
+            lambda request: httpx.Response(404, json={})
+        )
+
+    def _handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        return self.handler(request)
+
+
+@pytest.fixture
+def graph(monkeypatch: pytest.MonkeyPatch) -> GraphMock:
+    """Client condiviso con trasporto simulato, cache svuotate e attese di retry azzerate."""
+    mock = GraphMock()
+    monkeypatch.setattr(m, "_client", httpx.AsyncClient(
+        base_url=m.API_BASE_URL,
+        params={"access_token": "test-token"},
+        transport=httpx.MockTransport(mock._handle)
+    ))
+
+    # Registra l'attesa calcolata (es. da Retry-After) senza dormire davvero
+    retry_delay = m._retry_delay
+
+    def _no_wait(attempt: int, response: httpx.Response) -> float:
+        mock.delays.append(retry_delay(attempt, response))
+        return 0
+
+    monkeypatch.setattr(m, "_retry_delay", _no_wait)
+
+    m._API_CACHE.clear()
+    m._ADSET_META_CACHE.clear()
+    m._THROTTLED_UNTIL.clear()
+    m._CAMPAIGN_ACCOUNTS.clear()
+    return mock
@@ -0,0 +1,77 @@
+"""Test della cache in memoria delle richieste GET."""
+
+import asyncio
+
+import httpx
+
+import meta_ads_mcp as m
+
+
+def test_cache_hit_skips_network(graph):
+    graph.handler = lambda request: httpx.Response(200, json={"id": "1", "name": "Camp"})
+
+    async def run():
+        first = await m._make_api_request("1", params={"fields": "name"})
+        second = await m._make_api_request("1", params={"fields": "name"})
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first == second == {"id": "1", "name": "Camp"}
+    assert len(graph.requests) == 1
+
+
+def test_cache_hit_returns_independent_copies(graph):
+    graph.handler = lambda request: httpx.Response(200, json={"data": [1]})
+
+    async def run():
+        first = await m._make_api_request("1")
+        first["data"].append(2)
+        return await m._make_api_request("1")
+
+    assert asyncio.run(run()) == {"data": [1]}
+
+
+def test_use_cache_false_forces_a_fresh_read(graph):
+    graph.handler = lambda request: httpx.Response(200, json={"id": "1"})
+
+    async def run():
+        await m._make_api_request("1")
+        await m._make_api_request("1", use_cache=False)
+
+    asyncio.run(run())
+    assert len(graph.requests) == 2
+
+
+def test_post_clears_cache(graph):
+    graph.handler = lambda request: httpx.Response(200, json={"success": True})
+
+    async def run():
+        await m._make_api_request("1", params={"fields": "status"})
+        await m._make_api_request("1", method="POST", params={"status": "PAUSED"})
+        await m._make_api_request("1", params={"fields": "status"})
+
+    asyncio.run(run())
+    assert [r.method for r in graph.requests] == ["GET", "POST", "GET"]
+
+
+def test_cache_ttl_tiers():
+    assert m._cache_ttl({"date_preset": "today"}) == m.API_CACHE_TTL_TODAY
+    assert m._cache_ttl({"date_preset": "yesterday"}) == m.API_CACHE_TTL_YESTERDAY
+    assert m._cache_ttl({"time_range": '{"since":"2020-01-01","until":"2020-01-31"}'}) == m.API_CACHE_TTL_HISTORICAL
+    assert m._cache_ttl({"date_preset": "last_7d"}) == m.API_CACHE_TTL
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = m._TTLCache(2)
+    cache.set("a", 1, 60)
+    cache.set("b", 2, 60)
+    cache.get("a")
+    cache.set("c", 3, 60)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+
+def test_ttl_cache_expires_entries():
+    cache = m._TTLCache(2)
+    cache.set("a", 1, -1)
+    assert cache.get("a") is None
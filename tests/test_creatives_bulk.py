@@ -0,0 +1,48 @@
+"""Test del tool meta_ads_get_creatives_bulk."""
+
+import asyncio
+
+import httpx
+import orjson
+import pytest
+from pydantic import ValidationError
+
+import meta_ads_mcp as m
+
+
+def _creatives(request: httpx.Request) -> httpx.Response:
+    ids = request.url.params["ids"].split(",")
+    return httpx.Response(200, json={
+        ad_id: {"id": ad_id, "creative": {"id": f"c{ad_id}", "name": f"Creative {ad_id}"}}
+        for ad_id in ids if ad_id != "missing"
+    })
+
+
+def test_ids_are_deduplicated_in_one_request(graph):
+    graph.handler = _creatives
+
+    result = asyncio.run(m.meta_ads_get_creatives_bulk(
+        m.GetCreativesBulkInput(ad_ids=["1", " 2 ", "1"], response_format="json")
+    ))
+
+    assert len(graph.requests) == 1
+    assert graph.requests[0].url.params["ids"] == "1,2"
+    data = orjson.loads(result)
+    assert data["count"] == 2
+    assert [c["ad_id"] for c in data["creatives"]] == ["1", "2"]
+
+
+def test_missing_creative_is_reported(graph):
+    graph.handler = _creatives
+
+    result = asyncio.run(m.meta_ads_get_creatives_bulk(
+        m.GetCreativesBulkInput(ad_ids=["1", "missing"])
+    ))
+
+    assert "Creative 1" in result
+    assert "Annuncio ID: missing\nNessun creative trovato." in result
+
+
+def test_too_many_ids_are_rejected():
+    with pytest.raises(ValidationError):
+        m.GetCreativesBulkInput(ad_ids=[str(i) for i in range(51)])
@@ -0,0 +1,20 @@
+"""Test degli helper di formattazione dell'output Markdown."""
+
+import meta_ads_mcp as m
+
+
+def test_genders_text_accepts_int_and_float_codes():
+    assert m._genders_text([1, 2]) == "Uomini, Donne"
+    # Il targeting è un dict libero: i codici possono arrivare come float
+    assert m._genders_text([1.0, 2]) == "Uomini, Donne"
+
+
+def test_genders_text_keeps_unknown_codes():
+    assert m._genders_text([3, "x"]) == "3, x"
+
+
+def test_insight_frequency_is_shown_as_returned():
+    rows = m._INSIGHT_ROWS.validate_python([{"impressions": "10", "frequency": "1.23456"}])
+    text = m._INSIGHT_TMPL.format_map(m._insight_view(rows[0], "Totale"))
+    assert "- **Frequency**: 1.23456\n" in text
+    assert "- **Impressions**: 10\n" in text
@@ -0,0 +1,90 @@
+"""Test delle richieste batch e degli aggiornamenti degli ad set."""
+
+import asyncio
+from urllib.parse import parse_qs
+
+import httpx
+import orjson
+
+import meta_ads_mcp as m
+
+ADSET = {"id": "111", "name": "AS1", "status": "PAUSED", "daily_budget": "1500"}
+
+
+def _batch(request: httpx.Request):
+    """Sotto-richieste inviate in un batch (None se la richiesta non è un batch)."""
+    form = parse_qs(request.content.decode())
+    return orjson.loads(form["batch"][0]) if "batch" in form else None
+
+
+def test_batch_sub_request_error_maps_to_bad_request_message(graph):
+    error = {"error": {"message": "Invalid parameter", "code": 100, "error_subcode": 1487, "fbtrace_id": "T"}}
+    graph.handler = lambda request: httpx.Response(200, json=[
+        {"code": 200, "body": orjson.dumps(ADSET).decode()},
+        {"code": 400, "body": orjson.dumps(error).decode()}
+    ])
+
+    result = asyncio.run(m.meta_ads_update_adset_budget(
+        m.UpdateAdSetBudgetInput(adset_id="111", daily_budget=2000)
+    ))
+    assert result == m._format_bad_request(httpx.Response(400, json=error))
+    assert "Invalid parameter" in result
+
+
+def test_batch_sub_request_timeout_maps_to_timeout_message(graph):
+    graph.handler = lambda request: httpx.Response(200, json=[None])
+
+    async def run():
+        try:
+            await m._graph_batch([{"method": "GET", "relative_url": "111"}])
+        except Exception as e:
+            return m._handle_api_error(e)
+
+    assert asyncio.run(run()) == m._TIMEOUT_ERROR
+
+
+def test_budget_update_reads_and_writes_in_one_batch(graph):
+    graph.handler = lambda request: httpx.Response(200, json=[
+        {"code": 200, "body": orjson.dumps(ADSET).decode()},
+        {"code": 200, "body": '{"success": true}'}
+    ])
+
+    result = asyncio.run(m.meta_ads_update_adset_budget(
+        m.UpdateAdSetBudgetInput(adset_id="111", daily_budget=2000, response_format="json")
+    ))
+
+    assert orjson.loads(result)["old_budget_cents"] == 1500
+    assert len(graph.requests) == 1
+    get, post = _batch(graph.requests[0])
+    assert get["name"] == "current" and get["method"] == "GET"
+    assert post["depends_on"] == "current" and post["body"] == "daily_budget=2000"
+    # Dopo la scrittura i metadati in cache riflettono il nuovo budget
+    assert m._ADSET_META_CACHE.get("111")["daily_budget"] == "2000"
+
+
+def test_status_already_set_sends_no_write(graph):
+    graph.handler = lambda request: httpx.Response(200, json=ADSET)
+
+    result = asyncio.run(m.meta_ads_update_adset_status(
+        m.UpdateAdSetStatusInput(adset_id="111", status="PAUSED", response_format="json")
+    ))
+
+    assert orjson.loads(result)["changed"] is False
+    assert [r.method for r in graph.requests] == ["GET"]
+
+
+def test_status_change_reads_then_posts(graph):
+    def handler(request):
+        if request.method == "GET":
+            return httpx.Response(200, json=ADSET)
+        return httpx.Response(200, json={"success": True})
+
+    graph.handler = handler
+
+    result = asyncio.run(m.meta_ads_update_adset_status(
+        m.UpdateAdSetStatusInput(adset_id="111", status="ACTIVE", response_format="json")
+    ))
+
+    assert orjson.loads(result)["changed"] is True
+    assert [r.method for r in graph.requests] == ["GET", "POST"]
+    assert _batch(graph.requests[1]) is None
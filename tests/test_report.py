@@ -0,0 +1,60 @@
+"""Test dei periodi multipli di meta_ads_generate_report."""
+
+import asyncio
+
+import httpx
+import orjson
+import pytest
+from pydantic import ValidationError
+
+import meta_ads_mcp as m
+
+
+def _rows(request: httpx.Request) -> httpx.Response:
+    ranges = orjson.loads(request.url.params["time_ranges"])
+    return httpx.Response(200, json={"data": [
+        {"gender": "female", "impressions": "100", "clicks": "5", "spend": "1.5",
+         "date_start": r["since"], "date_stop": r["until"]}
+        for r in ranges
+    ]})
+
+
+def _report(**kwargs) -> m.GenerateReportInput:
+    return m.GenerateReportInput(
+        object_id="act_1",
+        breakdowns=["gender"],
+        time_ranges=[
+            {"since": "2025-01-01", "until": "2025-01-07"},
+            {"since": "2025-01-08", "until": "2025-01-14"}
+        ],
+        **kwargs
+    )
+
+
+def test_time_ranges_are_serialized_as_json_list(graph):
+    graph.handler = _rows
+
+    asyncio.run(m.meta_ads_generate_report(_report(since="2024-12-01", until="2024-12-31")))
+
+    params = graph.requests[0].url.params
+    assert orjson.loads(params["time_ranges"]) == [
+        {"since": "2025-01-01", "until": "2025-01-07"},
+        {"since": "2025-01-08", "until": "2025-01-14"}
+    ]
+    # time_ranges ha priorità su date_preset e since/until
+    assert "time_range" not in params
+    assert "date_preset" not in params
+
+
+def test_time_ranges_segments_show_their_period(graph):
+    graph.handler = _rows
+
+    result = asyncio.run(m.meta_ads_generate_report(_report()))
+
+    assert "Periodo: 2025-01-01 - 2025-01-07" in result
+    assert "Periodo: 2025-01-08 - 2025-01-14" in result
+
+
+def test_empty_time_ranges_are_rejected():
+    with pytest.raises(ValidationError):
+        m.GenerateReportInput(object_id="act_1", time_ranges=[])
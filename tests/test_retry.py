@@ -0,0 +1,91 @@
+"""Test del retry con backoff e del rallentamento sugli header di utilizzo."""
+
+import asyncio
+
+import httpx
+import orjson
+
+import meta_ads_mcp as m
+
+
+def _sequence(*responses):
+    """Handler che restituisce le risposte nell'ordine, ripetendo l'ultima."""
+    queue = list(responses)
+    return lambda request: queue.pop(0) if len(queue) > 1 else queue[0]
+
+
+def test_rate_limit_is_retried_after_retry_after(graph):
+    graph.handler = _sequence(
+        httpx.Response(429, headers={"Retry-After": "7"}, json={}),
+        httpx.Response(200, json={"id": "1"})
+    )
+
+    assert asyncio.run(m._make_api_request("1")) == {"id": "1"}
+    assert len(graph.requests) == 2
+    assert graph.delays == [7.0]
+
+
+def test_throttle_error_code_is_retried(graph):
+    graph.handler = _sequence(
+        httpx.Response(400, json={"error": {"message": "too many calls", "code": 17}}),
+        httpx.Response(200, json={"id": "1"})
+    )
+
+    assert asyncio.run(m._make_api_request("1")) == {"id": "1"}
+    assert len(graph.requests) == 2
+
+
+def test_get_server_error_is_retried(graph):
+    graph.handler = _sequence(
+        httpx.Response(500, json={}),
+        httpx.Response(503, json={}),
+        httpx.Response(200, json={"id": "1"})
+    )
+
+    assert asyncio.run(m._make_api_request("1")) == {"id": "1"}
+    assert len(graph.requests) == 3
+
+
+def test_get_server_error_gives_up_after_max_retries(graph):
+    graph.handler = lambda request: httpx.Response(500, json={})
+
+    result = asyncio.run(m.meta_ads_get_insights(m.GetInsightsInput(object_id="act_1")))
+    assert "status 500" in result
+    assert len(graph.requests) == m.API_MAX_RETRIES + 1
+
+
+def test_post_server_error_is_not_retried(graph):
+    graph.handler = lambda request: httpx.Response(500, json={})
+
+    async def run():
+        try:
+            await m._make_api_request("1", method="POST", params={"status": "PAUSED"})
+        except httpx.HTTPStatusError as e:
+            return e.response.status_code
+
+    assert asyncio.run(run()) == 500
+    assert len(graph.requests) == 1
+
+
+def test_bad_request_is_not_retried(graph):
+    graph.handler = lambda request: httpx.Response(400, json={"error": {"message": "bad", "code": 100}})
+
+    result = asyncio.run(m.meta_ads_get_insights(m.GetInsightsInput(object_id="act_1")))
+    assert "bad" in result
+    assert len(graph.requests) == 1
+
+
+def test_usage_header_over_threshold_throttles_the_account(graph):
+    usage = {"call_count": 95, "total_cputime": 10, "total_time": 10}
+    graph.handler = lambda request: httpx.Response(
+        200, headers={"x-app-usage": orjson.dumps(usage).decode()}, json={"data": []}
+    )
+
+    asyncio.run(m._make_api_request("act_1/campaigns"))
+    assert m._THROTTLED_UNTIL.get("act_1", 0) > 0
+
+
+def test_usage_pause_reads_business_use_case_header():
+    usage = {"123": [{"call_count": 10, "estimated_time_to_regain_access": 2}]}
+    assert m._usage_pause(usage) == 120
+    assert m._usage_pause({"call_count": 10, "total_cputime": 5, "total_time": 5}) == 0